@@ -12,7 +12,67 @@ from .config import (
     set_config_value, get_config_value, list_config
 )
 from .git_utils import get_commit_range, is_git_repo
-from .message_generator import process_commits
+
+
+# Options shared by the commit-processing commands, as (flag, add_argument kwargs)
+BRANCH_OPTIONS = [
+    ("--all-branches", {"action": "store_true", "help": "Process commits across all branches"}),
+    ("--only-main", {"action": "store_true", "help": "Process commits only on the main/master branch"}),
+]
+
+BEHAVIOR_OPTIONS = [
+    ("--just-fix-it", {"action": "store_true", "help": "Automatically apply changes without confirmation"}),
+    ("--ask-why", {"action": "store_true", "help": "Prompt for the reason behind each commit"}),
+    ("--why", {"type": str, "help": "Provide a global reason for all commits"}),
+    ("--model", {"type": str, "help": "Specify the AI model to use (e.g., gpt-4, claude-3.5)"}),
+    ("--dry-run", {"action": "store_true", "help": "Show what would be done without making changes"}),
+    ("--no-cache", {"action": "store_true", "help": "Don't reuse or save AI responses in the on-disk cache"}),
+]
+
+
+def fast_parse_args(args: List[str]) -> Optional[argparse.Namespace]:
+    """
+    Parse the common `last N`, `first N` and `.` forms without argparse.
+    
+    Returns None for anything else (including --help and invalid input), in
+    which case parse_args() should be used to handle or report it.
+    """
+    if not args or args[0] not in ("last", "first", "."):
+        return None
+    
+    values = {"command": args[0]}
+    rest = iter(args[1:])
+    if args[0] != ".":
+        count = next(rest, "")
+        if not count.isdecimal():
+            return None
+        values["count"] = int(count)
+    
+    options = dict(BRANCH_OPTIONS + BEHAVIOR_OPTIONS)
+    for flag, kwargs in options.items():
+        values[flag[2:].replace("-", "_")] = False if kwargs.get("action") == "store_true" else None
+    
+    for arg in rest:
+        flag, has_value, value = arg.partition("=")
+        kwargs = options.get(flag)
+        if kwargs is None:
+            return None
+        
+        if kwargs.get("action") == "store_true":
+            if has_value:
+                return None
+            value = True
+        elif not has_value:
+            value = next(rest, None)
+            if value is None or value.startswith("-"):
+                return None
+        values[flag[2:].replace("-", "_")] = value
+    
+    # Mutually exclusive; let argparse report the error
+    if values["all_branches"] and values["only_main"]:
+        return None
+    
+    return argparse.Namespace(**values)
 
 
 def parse_args(args: List[str]) -> argparse.Namespace:
@@ -62,36 +122,12 @@ def parse_args(args: List[str]) -> argparse.Namespace:
     for subparser in [current_parser, last_parser, first_parser]:
         # Branch options
         branch_group = subparser.add_mutually_exclusive_group()
-        branch_group.add_argument(
-            "--all-branches", action="store_true",
-            help="Process commits across all branches"
-        )
-        branch_group.add_argument(
-            "--only-main", action="store_true",
-            help="Process commits only on the main/master branch"
-        )
+        for flag, kwargs in BRANCH_OPTIONS:
+            branch_group.add_argument(flag, **kwargs)
         
         # Behavior options
-        subparser.add_argument(
-            "--just-fix-it", action="store_true",
-            help="Automatically apply changes without confirmation"
-        )
-        subparser.add_argument(
-            "--ask-why", action="store_true",
-            help="Prompt for the reason behind each commit"
-        )
-        subparser.add_argument(
-            "--why", type=str,
-            help="Provide a global reason for all commits"
-        )
-        subparser.add_argument(
-            "--model", type=str,
-            help="Specify the AI model to use (e.g., gpt-4, claude-3.5)"
-        )
-        subparser.add_argument(
-            "--dry-run", action="store_true",
-            help="Show what would be done without making changes"
-        )
+        for flag, kwargs in BEHAVIOR_OPTIONS:
+            subparser.add_argument(flag, **kwargs)
 
     return parser.parse_args(args)
 
@@ -145,8 +181,8 @@ def handle_config_command(args: argparse.Namespace) -> None:
 
 def main() -> None:
     """Main entry point for the CLI."""
-    # Parse command line arguments
-    args = parse_args(sys.argv[1:])
+    # Parse command line arguments, skipping argparse for the common forms
+    args = fast_parse_args(sys.argv[1:]) or parse_args(sys.argv[1:])
     validate_args(args)
     
     # Handle config commands
@@ -168,7 +204,10 @@ def main() -> None:
         print("No commits to process")
         sys.exit(0)
 
-    # Process the commits
+    # Process the commits. Imported here so --help, config commands and early
+    # exits don't pay for loading colorama and the HTTP stack
+    from .message_generator import process_commits
+    
     process_commits(
         commit_range,
         auto_apply=args.just_fix_it or config.get("defaults", {}).get("auto_apply", False),
@@ -176,7 +215,8 @@ def main() -> None:
         global_why=args.why,
         model=args.model or config.get("provider", {}).get("engine", "gpt-4"),
         dry_run=args.dry_run,
-        config=config
+        config=config,
+        use_cache=not args.no_cache,
     )
 
 
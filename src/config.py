@@ -1,26 +1,155 @@
 #!/usr/bin/env python3
 
 import os
-import configparser
+import re
 import stat
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple
 
 
+# Matches "[section]" headers, "key = value" lines and indented continuation
+# lines of multi-line values in a single pass
+_INI_PATTERN = re.compile(
+    r"^\[(?P<section>[^\]\n]+)\][ \t]*$"
+    r"|^(?P<key>[^\s=:#;\[][^=:\n]*?)[ \t]*[=:][ \t]*(?P<value>.*?)[ \t]*$"
+    r"|^[ \t]+(?P<continuation>(?:[^\s#;].*?)?)[ \t]*$",
+    re.MULTILINE,
+)
+
+
+# Sections known to the tool, whether or not they appear in the config file
+_SECTIONS = ("provider", "defaults", "behavior", "formatting")
+
+# String values that are stored as booleans
+_COERCE = {
+    "true": True, "yes": True, "1": True,
+    "false": False, "no": False, "0": False,
+}
+
+
+# Truthy spellings for environment variables, including common capitalizations
+_TRUTHY = frozenset({"true", "yes", "1", "TRUE", "YES", "True", "Yes"})
+
+
+def _coerce(value: str) -> Any:
+    """Convert a string config value to a bool or int where it looks like one."""
+    # None of the boolean spellings is longer than five characters
+    result = _COERCE.get(value.lower()) if len(value) <= 5 else None
+    if result is not None:
+        return result
+    return int(value) if value.isdigit() else value
+
+
+@lru_cache(maxsize=1)
+def _home_config_path() -> Path:
+    """Get the path to the configuration file in the user's home directory."""
+    return Path.home() / ".unfckrc"
+
+
+@lru_cache(maxsize=1)
 def get_config_path() -> Path:
     """Get the path to the configuration file."""
     # Check for config in the current directory first
-    local_config = Path(".unfckrc")
-    if local_config.exists():
-        return local_config
+    local_config = ".unfckrc"
+    try:
+        os.stat(local_config)
+        return Path(local_config)
+    except OSError:
+        pass
 
     # Then check in the user's home directory
-    home_config = Path.home() / ".unfckrc"
-    return home_config
+    return _home_config_path()
 
 
 def load_config() -> Dict[str, Any]:
     """Load configuration from file and environment variables."""
+    config_path = get_config_path()
+    
+    # Parsed file contents are cached until the file changes on disk
+    try:
+        st = config_path.stat()
+        mtime_ns, size = st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        mtime_ns, size = -1, -1
+    
+    # Copy so callers can modify the result without touching the cache
+    cached = _load_config_cached(str(config_path), mtime_ns, size)
+    config = {section: dict(values) for section, values in cached.items()}
+
+    # Override with environment variables
+    api_key = os.environ.get("OPENROUTER_API_KEY")
+    if api_key is not None:
+        config["provider"]["api_key"] = api_key
+    
+    model = os.environ.get("UNFCK_MODEL")
+    if model is not None:
+        config["provider"]["engine"] = model
+    
+    auto_apply = os.environ.get("UNFCK_AUTO_APPLY")
+    if auto_apply is not None:
+        # Only lower-case values that are not already one of the listed spellings
+        config["defaults"]["auto_apply"] = auto_apply in _TRUTHY or auto_apply.lower() in _TRUTHY
+    
+    return config
+
+
+def _parse_ini(text: str) -> Dict[str, Dict[str, str]]:
+    """Parse the flat INI format used by .unfckrc into raw string values."""
+    sections: Dict[str, Dict[str, str]] = {}
+    current: Optional[Dict[str, str]] = None
+    
+    key: Optional[str] = None
+    
+    for match in _INI_PATTERN.finditer(text):
+        section = match.group("section")
+        continuation = match.group("continuation")
+        if section is not None:
+            current = sections.setdefault(section.strip(), {})
+            key = None
+        elif current is None:
+            continue
+        elif continuation is not None:
+            # Indented lines extend the value of the key before them
+            if key is not None:
+                current[key] = f"{current[key]}\n{continuation}"
+        else:
+            # Keys are case-insensitive, as with ConfigParser
+            key = match.group("key").lower()
+            current[key] = match.group("value")
+    
+    # Blank continuation lines only count inside a value, not at its end
+    for values in sections.values():
+        for name, value in values.items():
+            values[name] = value.rstrip("\n")
+    
+    return sections
+
+
+def _format_ini(config: Dict[str, Dict[str, Any]]) -> str:
+    """Render a config dictionary in the same INI layout ConfigParser writes."""
+    parts = []
+    for section, values in config.items():
+        parts.append(f"[{section}]\n")
+        for key, value in values.items():
+            # Continuation lines are indented, as ConfigParser does
+            text = str(value).replace("\n", "\n\t")
+            parts.append(f"{key} = {text}\n")
+        parts.append("\n")
+    return "".join(parts)
+
+
+def _read_raw_config(path: Path) -> Dict[str, Dict[str, str]]:
+    """Read the config file as stored on disk, without defaults or env overrides."""
+    try:
+        return _parse_ini(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+@lru_cache(maxsize=4)
+def _load_config_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Dict[str, Any]]:
+    """Load defaults merged with the config file at path (mtime_ns < 0 if missing)."""
     config: Dict[str, Dict[str, Any]] = {
         "provider": {},
         "defaults": {},
@@ -32,46 +161,31 @@ def load_config() -> Dict[str, Any]:
     config["defaults"]["default_commit_count"] = 5
     config["defaults"]["auto_apply"] = False
     config["defaults"]["prompt_user_for_why"] = True
+    config["defaults"]["max_commits"] = 200
     config["behavior"]["show_diff"] = True
     config["behavior"]["skip_merge_commits"] = True
     config["behavior"]["warn_on_shared_branches"] = True
     config["behavior"]["remove_quotes"] = True
+    config["behavior"]["max_diff_chars"] = 8000
+    config["behavior"]["parallel_llm"] = True
+    config["behavior"]["cache_ttl_days"] = 30
+    config["behavior"]["batch_size"] = 8
+    config["behavior"]["skip_good_messages"] = False
+    config["behavior"]["few_shot_examples"] = 2
     config["formatting"]["use_color"] = True
     config["formatting"]["message_style"] = "descriptive"
     config["provider"]["engine"] = "gpt-4"
 
     # Load from config file if it exists
-    config_path = get_config_path()
-    if config_path.exists():
-        parser = configparser.ConfigParser()
-        parser.read(config_path)
+    if mtime_ns >= 0:
+        parsed = _parse_ini(Path(path).read_text())
         
-        # Convert ConfigParser object to our dictionary structure
-        for section in parser.sections():
-            if section not in config:
-                config[section] = {}
-            
-            for key, value in parser.items(section):
-                # Convert string values to appropriate types
-                if value.lower() in ("true", "yes", "1"):
-                    config[section][key] = True
-                elif value.lower() in ("false", "no", "0"):
-                    config[section][key] = False
-                elif value.isdigit():
-                    config[section][key] = int(value)
-                else:
-                    config[section][key] = value
+        # Merge the parsed sections into our dictionary structure
+        for section, values in parsed.items():
+            target = config.setdefault(section, {})
+            for key, value in values.items():
+                target[key] = _coerce(value)
 
-    # Override with environment variables
-    if "OPENROUTER_API_KEY" in os.environ:
-        config["provider"]["api_key"] = os.environ["OPENROUTER_API_KEY"]
-    
-    if "UNFCK_MODEL" in os.environ:
-        config["provider"]["engine"] = os.environ["UNFCK_MODEL"]
-    
-    if "UNFCK_AUTO_APPLY" in os.environ:
-        config["defaults"]["auto_apply"] = os.environ["UNFCK_AUTO_APPLY"].lower() in ("true", "yes", "1")
-    
     return config
 
 
@@ -104,27 +218,24 @@ def save_config(config: Dict[str, Any], path: Optional[Path] = None) -> None:
     if path is None:
         path = get_config_path()
     
-    parser = configparser.ConfigParser()
-    
-    # Convert our dictionary to ConfigParser format
-    for section, values in config.items():
-        parser[section] = {}
-        for key, value in values.items():
-            parser[section][key] = str(value)
-    
     # Write to file
     with open(path, "w") as f:
-        parser.write(f)
+        f.write(_format_ini(config))
+    
+    # Make the next load_config() see the new contents
+    _load_config_cached.cache_clear()
+    get_config_path.cache_clear()
 
 
 def save_config_secure(config: Dict[str, Any], path: Optional[Path] = None) -> None:
     """Save configuration with secure file permissions."""
-    # Save the config
-    save_config(config, path)
-    
+    # Resolve the path once for both the write and the chmod
     if path is None:
         path = get_config_path()
     
+    # Save the config
+    save_config(config, path)
+    
     # Set secure permissions (readable/writable only by the owner)
     try:
         os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)  # 0o600
@@ -143,15 +254,15 @@ def set_token(token: str) -> Tuple[bool, str]:
     if not is_valid:
         return False, f"Invalid token: {message}"
     
-    # Load existing config
-    config = load_config()
-    
-    # Update the token
-    config["provider"]["api_key"] = token
+    # Update the token in the stored config only, so that defaults and
+    # environment overrides are not written to the file
+    path = get_config_path()
+    config = _read_raw_config(path)
+    config.setdefault("provider", {})["api_key"] = token
     
     # Save with secure permissions
     try:
-        save_config_secure(config)
+        save_config_secure(config, path)
         return True, f"Token {mask_token(token)} saved successfully"
     except Exception as e:
         return False, f"Failed to save token: {e}"
@@ -178,29 +289,21 @@ def set_config_value(section: str, key: str, value: str) -> Tuple[bool, str]:
     Returns:
         Tuple[bool, str]: (success, message)
     """
-    # Load existing config
-    config = load_config()
+    # Work on the stored config only, so that defaults and environment
+    # overrides are not written to the file
+    path = get_config_path()
+    config = _read_raw_config(path)
     
     # Ensure section exists
-    if section not in config:
+    if section not in _SECTIONS and section not in config:
         return False, f"Invalid section: {section}"
     
-    # Convert value to appropriate type
-    if value.lower() in ("true", "yes", "1"):
-        typed_value = True
-    elif value.lower() in ("false", "no", "0"):
-        typed_value = False
-    elif value.isdigit():
-        typed_value = int(value)
-    else:
-        typed_value = value
-    
-    # Update the value
-    config[section][key] = typed_value
+    # Update the value; it is converted to the appropriate type when loaded
+    config.setdefault(section, {})[key] = value
     
     # Save the config
     try:
-        save_config(config)
+        save_config(config, path)
         return True, f"Set {section}.{key} = {value}"
     except Exception as e:
         return False, f"Failed to save configuration: {e}"
@@ -1,19 +1,180 @@
 #!/usr/bin/env python3
 
+import atexit
+import json
 import os
+import re
+import shlex
 import subprocess
-from typing import List, Dict, Any, Optional, Tuple
+import sys
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-import git
 
+class _GitBatchProcess:
+    """A long-running git child process that is fed one request per line."""
 
-def is_git_repo() -> bool:
-    """Check if the current directory is a Git repository."""
+    def __init__(self, *args: str):
+        self._args = ["git", *args]
+        self._process: Optional[subprocess.Popen] = None
+
+    def _request(self, line: str):
+        """Send a request line and return the stream to read the reply from."""
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                self._args,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        self._process.stdin.write(f"{line}\n".encode())
+        self._process.stdin.flush()
+        return self._process.stdout
+
+    def close(self) -> None:
+        """Close the pipes and wait for the child process to exit."""
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+
+class _GitCatFile(_GitBatchProcess):
+    """Reads raw objects through a persistent `git cat-file --batch`."""
+
+    def __init__(self):
+        super().__init__("cat-file", "--batch")
+
+    def fetch(self, rev: str) -> Tuple[str, str, bytes]:
+        """Return the full object name, type and payload for a revision."""
+        stdout = self._request(rev)
+        header = stdout.readline().decode().split()
+        if len(header) != 3:
+            raise ValueError(f"Object {rev} not found")
+
+        sha, obj_type, size = header
+        payload = stdout.read(int(size))
+        stdout.read(1)  # Trailing newline after the payload
+        return sha, obj_type, payload
+
+
+class _GitDiffTree(_GitBatchProcess):
+    """Produces commit metadata and patches through a persistent `git diff-tree --stdin`."""
+
+    # diff-tree echoes lines that are not object names, which marks the end
+    # of the patch for the commit requested before it
+    SENTINEL = "--unfck-end--"
+
+    def __init__(self):
+        super().__init__(*_DIFF_TREE_ARGS)
+
+    def commit(self, sha: str) -> Tuple[str, str, str]:
+        """Return the message, author and patch of a commit (full object name required)."""
+        stdout = self._request(f"{sha}\n{self.SENTINEL}")
+        sentinel = f"{self.SENTINEL}\n".encode()
+        lines = []
+        for line in iter(stdout.readline, b""):
+            if line == sentinel:
+                break
+            lines.append(line)
+        
+        # Unknown objects produce no output at all
+        record = b"".join(lines)
+        if not record.startswith(_RECORD_START):
+            raise ValueError(f"Commit {sha} not found")
+        
+        _, message, author, diff = _parse_log_record(record)
+        return message, author, diff
+
+
+# Commit info fetched by iter_commits_with_info and get_commit_info, keyed by hash
+_COMMIT_INFO: Dict[str, Tuple[str, str, str]] = {}
+
+# Every record starts on a new line with an ASCII record separator, followed by
+# NUL-separated hash, author and message; the patch makes up the rest
+_LOG_FORMAT = "%x1e%H%x00%an <%ae>%x00%B%x00"
+_RECORD_START = b"\x1e"
+
+# Reads commits in that format through `git diff-tree --stdin`. --always
+# prints the header for commits with an empty patch too, and rename detection
+# is turned off since a rename shows up just as well as a delete and an add
+_DIFF_TREE_ARGS = ("diff-tree", "--stdin", "-p", "--root", "--always", "--no-renames", f"--format={_LOG_FORMAT}")
+
+# A full SHA-1 or SHA-256 object name
+_FULL_SHA = re.compile(r"[0-9a-f]{40}(?:[0-9a-f]{24})?")
+
+
+class CommitInfoBatcher:
+    """
+    Looks up commit information through persistent git processes.
+    
+    The git processes start on first use and serve every lookup until close(),
+    so N lookups cost a fixed number of git startups. Use it as a context
+    manager to scope the processes:
+    
+        with CommitInfoBatcher() as batcher:
+            infos = [batcher.info(h) for h in commit_hashes]
+    """
+    
+    def __init__(self):
+        self._cat_file = _GitCatFile()
+        self._diff_tree = _GitDiffTree()
+    
+    def __enter__(self) -> "CommitInfoBatcher":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def raw(self, commit_hash: str) -> Tuple[str, bytes]:
+        """Get the full hash and the raw object contents of a commit."""
+        sha, obj_type, payload = self._cat_file.fetch(commit_hash)
+        if obj_type != "commit":
+            raise ValueError(f"{commit_hash} is a {obj_type}, not a commit")
+        return sha, payload
+    
+    def info(self, commit_hash: str) -> Tuple[str, str, str]:
+        """Get the message, author and diff of a commit."""
+        # Full hashes need a single round trip; anything else is resolved first
+        if not _FULL_SHA.fullmatch(commit_hash):
+            commit_hash, _ = self.raw(commit_hash)
+        return self._diff_tree.commit(commit_hash)
+    
+    def parents(self, commit_hash: str) -> List[str]:
+        """Get the parent hashes of a commit (empty for a root commit)."""
+        _, payload = self.raw(commit_hash)
+        headers = payload.partition(b"\n\n")[0].split(b"\n")
+        return [line[len(b"parent "):].decode() for line in headers if line.startswith(b"parent ")]
+    
+    def close(self) -> None:
+        """Shut down the git processes."""
+        self._cat_file.close()
+        self._diff_tree.close()
+
+
+# Used by get_commit_info for commits not read through iter_commits_with_info
+_BATCHER = CommitInfoBatcher()
+atexit.register(_BATCHER.close)
+
+
+@lru_cache(maxsize=8)
+def _is_git_repo(cwd: str, git_dir: Optional[str]) -> bool:
+    """Check if cwd is inside a Git repository; cached, as the answer doesn't change."""
+    # Look for .git in this directory or a parent without spawning git, unless
+    # GIT_DIR points somewhere else
+    if git_dir is None:
+        path = Path(cwd).resolve()
+        return any((parent / ".git").exists() for parent in (path, *path.parents))
+    
     try:
         subprocess.run(
             ["git", "rev-parse", "--is-inside-work-tree"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
             check=True,
         )
         return True
@@ -21,21 +182,18 @@ def is_git_repo() -> bool:
         return False
 
 
+def is_git_repo() -> bool:
+    """Check if the current directory is a Git repository."""
+    return _is_git_repo(os.getcwd(), os.environ.get("GIT_DIR"))
+
+
 def get_first_n_commits(n: int) -> List[str]:
     """Get the first N commits in the repository (oldest first)."""
     try:
-        repo = git.Repo(os.getcwd())
-        
-        # Get all commits
-        all_commits = list(repo.iter_commits('HEAD'))
-        
-        # The last ones in the list are the oldest (first) commits
-        first_n = all_commits[-n:] if len(all_commits) >= n else all_commits
-        
-        # Reverse to process from oldest to newest
-        return [commit.hexsha for commit in reversed(first_n)]
+        # List from oldest to newest and keep the first N
+        return _rev_list("--reverse", "HEAD")[:n]
     
-    except git.GitCommandError as e:
+    except subprocess.CalledProcessError as e:
         print(f"Git error: {e}")
         return []
     except Exception as e:
@@ -43,58 +201,167 @@ def get_first_n_commits(n: int) -> List[str]:
         return []
 
 
+@lru_cache(maxsize=1)
+def _probe_branches(cwd: str) -> Tuple[Optional[str], str]:
+    """
+    Get the current branch (None when detached) and the main branch name.
+    
+    Both come from a single `git for-each-ref` call, which marks the checked out
+    branch with '*'. The result is cached for the rest of the run.
+    """
+    result = subprocess.run(
+        ["git", "for-each-ref", "--format=%(HEAD)%(refname:short)", "refs/heads/"],
+        capture_output=True, text=True, check=True
+    )
+    current_branch = None
+    branches = set()
+    for line in result.stdout.splitlines():
+        name = line[1:]
+        if line.startswith("*"):
+            current_branch = name
+        branches.add(name)
+    
+    # The main branch is usually 'main' or 'master'
+    main_branch = "main" if "main" in branches else "master"
+    return current_branch, main_branch
+
+
+def _probe() -> Tuple[Optional[str], str]:
+    """Get the current and main branch names for the current working directory."""
+    return _probe_branches(os.getcwd())
+
+
+@lru_cache(maxsize=1)
+def _ensure_commit_graph(cwd: str) -> None:
+    """
+    Write a commit-graph file if the repository has none yet.
+    
+    The graph makes the history walks behind rev-list and merge-base much
+    faster on large repositories, but git only writes it during gc or when
+    configured to. Failures are ignored; the graph is only an optimization.
+    """
+    try:
+        info_dir = subprocess.check_output(
+            ["git", "rev-parse", "--git-path", "objects/info"],
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+        info_path = Path(cwd, info_dir)
+        if (info_path / "commit-graph").exists() or (info_path / "commit-graphs").exists():
+            return
+        
+        subprocess.run(["git", "commit-graph", "write", "--reachable"], check=False, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+
+def _rev_list(*args: str, max_count: Optional[int] = None) -> List[str]:
+    """
+    List commit hashes with `git rev-list`.
+    
+    Only the hashes are read, so no commit objects are parsed or built.
+    """
+    if max_count is not None:
+        args = (f"--max-count={max_count}", *args)
+    return subprocess.check_output(["git", "rev-list", *args], text=True).split()
+
+
+def _commits_since(shas: List[str], head: str) -> List[str]:
+    """
+    List the commits from the common ancestor of shas up to head, oldest first.
+    
+    Parents always come before their children. Any of shas that are missing
+    from the result are not reachable from head.
+    """
+    # The common ancestor of all of them is the oldest one when they are on one line
+    if len(shas) == 1:
+        [oldest] = shas
+    else:
+        _ensure_commit_graph(os.getcwd())
+        oldest = subprocess.run(
+            ["git", "merge-base", "--octopus", *shas],
+            capture_output=True, text=True
+        ).stdout.strip()
+    
+    # Without a common ancestor (unrelated histories) everything up to head counts
+    exclude = [f"^{parent}" for parent in _BATCHER.parents(oldest)] if oldest else []
+    return _rev_list("--reverse", "--topo-order", head, *exclude)
+
+
+def reachable_from_head(commit_hashes: List[str]) -> List[str]:
+    """Keep only the commits that are ancestors of HEAD (and so can be rewritten), in order."""
+    if not commit_hashes:
+        return []
+    try:
+        # Compare full hashes, whatever form the commits were named in
+        shas = [_BATCHER.raw(commit_hash)[0] for commit_hash in commit_hashes]
+        reachable = set(_commits_since(shas, _head_sha(os.getcwd())))
+    except (subprocess.CalledProcessError, ValueError) as e:
+        print(f"Git error: {e}")
+        return list(commit_hashes)
+    return [commit_hash for commit_hash, sha in zip(commit_hashes, shas) if sha in reachable]
+
+
+def _warn_if_capped(commits: List[str], max_commits: int) -> List[str]:
+    """Tell the user when a commit listing was cut off at max_commits."""
+    if len(commits) >= max_commits:
+        print(
+            f"Only processing the latest {max_commits} commits "
+            f"(change with: unfck config set defaults max_commits N)"
+        )
+    return commits
+
+
 def get_commit_range(args: Any, config: Dict[str, Any]) -> List[str]:
     """Get the range of commits to process based on command line arguments."""
     try:
-        repo = git.Repo(os.getcwd())
-        
         # Handle command selection
         if args.command == "last":
             # Handle 'last N' commits
             count = args.count
-            commits = list(repo.iter_commits('HEAD', max_count=count))
-            return [commit.hexsha for commit in commits]
+            return _rev_list("HEAD", max_count=count)
         
         elif args.command == "first":
             # Handle 'first N' commits
             count = args.count
             return get_first_n_commits(count)
         
-        elif args.command == ".":
+        # Listings that could cover the whole history are capped
+        max_commits = config.get("defaults", {}).get("max_commits", 200)
+        
+        if args.command == ".":
             # Handle current branch
-            # Get the current branch name
-            branch_name = repo.active_branch.name
+            branch_name, main_branch = _probe()
+            if branch_name is None:
+                branch_name = "HEAD"
             
-            # Get the merge base with the main branch (usually 'main' or 'master')
-            main_branch = 'main' if 'main' in repo.heads else 'master'
+            # Get all commits on HEAD that are not on the main branch, which
+            # is the range from their merge base without computing it first
+            _ensure_commit_graph(os.getcwd())
             try:
-                merge_base = repo.git.merge_base(branch_name, main_branch)
-                # Get all commits between merge_base and HEAD
-                commits = list(repo.iter_commits(f'{merge_base}..HEAD'))
-                return [commit.hexsha for commit in commits]
-            except git.GitCommandError:
+                commits = subprocess.check_output(
+                    ["git", "rev-list", f"--max-count={max_commits}", "HEAD", "--not", main_branch],
+                    stderr=subprocess.DEVNULL, text=True
+                ).split()
+            except subprocess.CalledProcessError:
                 # If there's an error (e.g., no common ancestor), just get all commits in the branch
-                commits = list(repo.iter_commits(branch_name))
-                return [commit.hexsha for commit in commits]
+                commits = _rev_list(branch_name, max_count=max_commits)
+            return _warn_if_capped(commits, max_commits)
         
         # Handle all branches
         if args.all_branches:
             # Get all commits in the repository
-            commits = list(repo.iter_commits('--all'))
-            return [commit.hexsha for commit in commits]
+            return _warn_if_capped(_rev_list("--all", max_count=max_commits), max_commits)
         
         # Handle only main branch
         if args.only_main:
-            main_branch = 'main' if 'main' in repo.heads else 'master'
-            commits = list(repo.iter_commits(main_branch))
-            return [commit.hexsha for commit in commits]
+            _, main_branch = _probe()
+            return _warn_if_capped(_rev_list(main_branch, max_count=max_commits), max_commits)
         
         # Default: use the last N commits specified in config
         default_count = config.get("defaults", {}).get("default_commit_count", 5)
-        commits = list(repo.iter_commits('HEAD', max_count=default_count))
-        return [commit.hexsha for commit in commits]
+        return _rev_list("HEAD", max_count=default_count)
     
-    except git.GitCommandError as e:
+    except subprocess.CalledProcessError as e:
         print(f"Git error: {e}")
         return []
     except Exception as e:
@@ -102,24 +369,90 @@ def get_commit_range(args: Any, config: Dict[str, Any]) -> List[str]:
         return []
 
 
+def _parse_log_record(record: bytes) -> Tuple[str, str, str, str]:
+    """Split a record produced with _LOG_FORMAT into hash, message, author and diff."""
+    sha, author, message, diff = record[len(_RECORD_START):].split(b"\x00", 3)
+    return (
+        sha.decode(),
+        message.decode("utf-8", errors="replace").strip(),
+        author.decode("utf-8", errors="replace"),
+        diff.decode("utf-8", errors="replace").strip("\n"),
+    )
+
+
+def iter_commits_with_info(commit_hashes: List[str]) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Yield (hash, message, author, diff) for each commit, in the order given.
+    
+    All commits are read from a single `git diff-tree` process instead of one
+    git invocation per commit. Unlike `git log`, diff-tree is plumbing: it only
+    reads the commits it is given and ignores log and color configuration.
+    Only full hashes are looked up. Results are also remembered for get_commit_info.
+    """
+    process = subprocess.Popen(
+        ["git", *_DIFF_TREE_ARGS],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    def feed() -> None:
+        try:
+            # Anything else would be echoed back into the output
+            full_hashes = (h for h in commit_hashes if _FULL_SHA.fullmatch(h))
+            process.stdin.write("".join(f"{h}\n" for h in full_hashes).encode())
+            process.stdin.close()
+        except OSError:
+            # git exited early; its error is reported below
+            pass
+    
+    # diff-tree answers while it reads, so writing every hash before reading
+    # could fill the output pipe and deadlock; feed them from a thread instead
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    
+    def flush(lines: List[bytes]) -> Tuple[str, str, str, str]:
+        sha, message, author, diff = _parse_log_record(b"".join(lines))
+        _COMMIT_INFO[sha] = (message, author, diff)
+        return sha, message, author, diff
+    
+    try:
+        record: List[bytes] = []
+        for line in process.stdout:
+            if line.startswith(_RECORD_START) and record:
+                yield flush(record)
+                record = []
+            record.append(line)
+        if record:
+            yield flush(record)
+    finally:
+        process.stdout.close()
+        writer.join()
+        stderr = process.stderr.read().decode(errors="replace").strip()
+        process.stderr.close()
+        # Without a message, git was only stopped by the closed pipe because
+        # iteration ended early
+        if process.wait() != 0 and stderr:
+            print(f"Git error: {stderr}")
+
+
 def get_commit_info(commit_hash: str) -> Tuple[str, str, str]:
     """Get the commit message, author, and diff for a given commit hash."""
     try:
-        repo = git.Repo(os.getcwd())
-        commit = repo.commit(commit_hash)
-        
-        # Get the commit message
-        message = commit.message.strip()
-        
-        # Get the author
-        author = f"{commit.author.name} <{commit.author.email}>"
-        
-        # Get the diff
-        diff = repo.git.show(commit_hash, format="")
-        
-        return message, author, diff
+        # Names like HEAD or a branch move when history is rewritten, so the
+        # cache is keyed by the full hash they currently point to
+        if not _FULL_SHA.fullmatch(commit_hash):
+            commit_hash, _ = _BATCHER.raw(commit_hash)
+        
+        cached = _COMMIT_INFO.get(commit_hash)
+        if cached is not None:
+            return cached
+        
+        # A commit's hash fixes its content, so the result can be kept for the whole run
+        info = _COMMIT_INFO[commit_hash] = _BATCHER.info(commit_hash)
+        return info
     
-    except git.GitCommandError as e:
+    except (OSError, ValueError) as e:
         print(f"Git error: {e}")
         return "", "", ""
     except Exception as e:
@@ -127,14 +460,28 @@ def get_commit_info(commit_hash: str) -> Tuple[str, str, str]:
         return "", "", ""
 
 
+@lru_cache(maxsize=1)
+def _head_sha(cwd: str) -> str:
+    """Get the hash of HEAD, cached until history is rewritten."""
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def get_head_sha() -> str:
+    """Get the hash of HEAD, or an empty string if it cannot be read."""
+    try:
+        return _head_sha(os.getcwd())
+    except Exception:
+        return ""
+
+
 def is_head_commit(commit_hash: str) -> bool:
     """Check if the commit is the HEAD commit."""
     try:
-        result = subprocess.run(
-            ["git", "rev-parse", "HEAD"],
-            capture_output=True, text=True, check=True
-        )
-        return result.stdout.strip() == commit_hash
+        return _head_sha(os.getcwd()) == commit_hash
     except Exception:
         return False
 
@@ -142,94 +489,107 @@ def is_head_commit(commit_hash: str) -> bool:
 def is_root_commit(commit_hash: str) -> bool:
     """Check if the commit is the root commit (first commit in the repository)."""
     try:
-        # Try to get the parent of the commit
-        result = subprocess.run(
-            ["git", "rev-parse", f"{commit_hash}^"],
-            capture_output=True, text=True, check=False
-        )
-        # If the command fails, it's the root commit
-        return result.returncode != 0
+        # Read the parents from the commit object instead of spawning git
+        return not _BATCHER.parents(commit_hash)
     except Exception:
         return False
 
 
-def clean_filter_branch_backup():
-    """Clean up the filter-branch backup refs."""
+@lru_cache(maxsize=1)
+def _recent_history(cwd: str, head: str, limit: int) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """Read (subject, changed paths) for the last `limit` commits ending at head."""
+    result = subprocess.run(
+        ["git", "-c", "core.quotePath=false", "log", f"--max-count={limit}", "--no-merges",
+         "--no-renames", "--format=%x1e%s", "--name-only", head],
+        capture_output=True, text=True, check=True
+    )
+    history = []
+    for record in result.stdout.split("\x1e")[1:]:
+        subject, _, names = record.partition("\n")
+        paths = tuple(name for name in names.split("\n") if name)
+        if paths:
+            history.append((subject.strip(), paths))
+    return tuple(history)
+
+
+def get_recent_history(limit: int = 500) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Get the subject and changed files of recent non-merge commits, newest first."""
+    try:
+        cwd = os.getcwd()
+        return list(_recent_history(cwd, _head_sha(cwd), limit))
+    except Exception as e:
+        print(f"Error reading commit history: {e}")
+        return []
+
+
+# Set when backup refs were deleted, so finalize_gc has objects to clean up
+_GC_PENDING = False
+
+# Lists the backup refs and deletes them in one update-ref transaction,
+# printing "deleted" if there were any
+_DELETE_BACKUPS_SCRIPT = """
+refs=$(git for-each-ref --format='delete %(refname)' refs/original/) || exit 1
+[ -z "$refs" ] && exit 0
+printf '%s\\n' "$refs" | git update-ref --stdin && echo deleted
+"""
+
+
+def delete_backup_refs() -> None:
+    """Delete the refs/original/ backups left by a previous git filter-branch."""
+    global _GC_PENDING
     try:
-        # Check if the backup refs exist
+        # A single shell runs the whole cleanup instead of one spawn per step
         result = subprocess.run(
-            ["git", "for-each-ref", "--format=%(refname)", "refs/original/"],
+            ["sh", "-c", _DELETE_BACKUPS_SCRIPT],
             capture_output=True,
             text=True,
             check=True
         )
         
-        if result.stdout.strip():
-            print("Cleaning up filter-branch backup refs...")
-            
-            # Get the current branch name
-            branch_result = subprocess.run(
-                ["git", "branch", "--show-current"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            current_branch = branch_result.stdout.strip()
-            
-            # Delete the backup refs for the current branch
-            if current_branch:
-                subprocess.run(
-                    ["git", "update-ref", "-d", f"refs/original/refs/heads/{current_branch}"],
-                    check=False,
-                    capture_output=True
-                )
-            
-            # Also try to delete master/main backup refs
-            for branch in ["master", "main"]:
-                subprocess.run(
-                    ["git", "update-ref", "-d", f"refs/original/refs/heads/{branch}"],
-                    check=False,
-                    capture_output=True
-                )
-            
-            # Expire reflog and run garbage collection
-            subprocess.run(
-                ["git", "reflog", "expire", "--expire=now", "--all"],
-                check=False,
-                capture_output=True
-            )
-            subprocess.run(
-                ["git", "gc", "--prune=now"],
-                check=False,
-                capture_output=True
-            )
-            print("Backup refs cleaned up")
+        if result.stdout.strip() == "deleted":
+            _GC_PENDING = True
+            print("Cleaned up filter-branch backup refs")
     except Exception as e:
         print(f"Warning: Failed to clean up backup refs: {e}")
 
 
+def finalize_gc() -> None:
+    """
+    Expire reflogs and garbage collect once backup refs have been deleted.
+    
+    Runs at exit rather than after every rewrite. `git gc --auto` only does
+    work when enough loose objects have piled up.
+    """
+    global _GC_PENDING
+    if not _GC_PENDING:
+        return
+    _GC_PENDING = False
+    
+    subprocess.run(
+        ["sh", "-c", "git reflog expire --expire=now --all; git gc --auto"],
+        check=False,
+        capture_output=True
+    )
+
+
+atexit.register(finalize_gc)
+
+
 def rewrite_head_commit(new_message: str) -> bool:
     """Rewrite the HEAD commit message using git commit --amend."""
     try:
         print("Rewriting HEAD commit message using git commit --amend...")
         
-        # Create a temporary file for the commit message
-        message_file = os.path.join(os.getcwd(), ".git", "COMMIT_MSG")
-        with open(message_file, "w") as f:
-            f.write(new_message)
-        
-        # Amend the commit with the new message
-        result = subprocess.run(
-            ["git", "commit", "--amend", "-F", message_file, "--no-edit"],
+        # Amend the commit, passing the new message on stdin. Hooks are
+        # skipped, as they are when past commits are recreated
+        subprocess.run(
+            ["git", "commit", "--amend", "-F", "-", "--no-edit", "--no-verify"],
+            input=new_message,
             check=True,
             capture_output=True,
             text=True
         )
         
-        # Clean up
-        if os.path.exists(message_file):
-            os.remove(message_file)
-        
         print("Successfully rewrote HEAD commit message")
         return True
     
@@ -246,58 +606,234 @@ def rewrite_head_commit(new_message: str) -> bool:
         return False
 
 
+def _rewrite_commit_object(payload: bytes, new_parents: Dict[str, str], message: Optional[str]) -> bytes:
+    """
+    Point a raw commit object at rewritten parents and optionally replace its message.
+    
+    Trees, authors, committers and dates are kept. Signatures are dropped from
+    commits that change, since they would no longer verify.
+    """
+    headers, _, body = payload.partition(b"\n\n")
+    lines = headers.split(b"\n")
+    parents = [line[len(b"parent "):].decode() for line in lines if line.startswith(b"parent ")]
+    if message is None and not any(parent in new_parents for parent in parents):
+        return payload
+    
+    kept = []
+    skipping = False
+    for line in lines:
+        # Lines starting with a space continue the previous header
+        if line.startswith(b" "):
+            if not skipping:
+                kept.append(line)
+            continue
+        
+        name = line.split(b" ", 1)[0]
+        skipping = name in (b"gpgsig", b"gpgsig-sha256") or (message is not None and name == b"encoding")
+        if skipping:
+            continue
+        
+        if name == b"parent":
+            parent = line[len(b"parent "):].decode()
+            line = f"parent {new_parents.get(parent, parent)}".encode()
+        kept.append(line)
+    
+    if message is not None:
+        body = message.strip("\n").encode("utf-8") + b"\n"
+    return b"\n".join(kept) + b"\n\n" + body
+
+
+def _replay_with_messages(messages: Dict[str, str]) -> None:
+    """
+    Rewrite commit messages by recreating the affected commits directly.
+    
+    Every commit from the oldest target up to HEAD is written again with its
+    parents pointing at the rewritten commits, and the current branch is moved
+    to the new tip with `git update-ref`. Trees are unchanged, so nothing is
+    checked out and the working tree and index are left alone; unlike
+    filter-branch there are no backup refs to clean up afterwards.
+    
+    Targets that are not ancestors of HEAD are skipped with a warning. Raises
+    ValueError if none of them are, or if HEAD was moved by something else
+    before the branch could be updated.
+    """
+    targets = {}
+    for commit_hash, message in messages.items():
+        sha, _ = _BATCHER.raw(commit_hash)
+        targets[sha] = message
+    
+    head = _head_sha(os.getcwd())
+    commits = _commits_since(list(targets), head)
+    
+    # Commits on other branches can't be rewritten here, but that is no reason
+    # to throw away the messages accepted for the rest
+    missing = set(targets).difference(commits)
+    if missing:
+        print(f"Warning: Skipping commits not in the current branch: {', '.join(sha[:7] for sha in missing)}")
+        for sha in missing:
+            del targets[sha]
+    if not targets:
+        raise ValueError("None of the commits are in the current branch")
+    
+    new_shas: Dict[str, str] = {}
+    for sha in commits:
+        _, payload = _BATCHER.raw(sha)
+        new_payload = _rewrite_commit_object(payload, new_shas, targets.get(sha))
+        if new_payload != payload:
+            new_shas[sha] = subprocess.run(
+                ["git", "hash-object", "-t", "commit", "-w", "--stdin"],
+                input=new_payload, capture_output=True, check=True
+            ).stdout.decode().strip()
+    
+    # Move the branch, but only if nothing else moved HEAD in the meantime.
+    # If something did, the rewritten commits are left unreferenced and the
+    # rewrite is abandoned rather than retried on top of unknown changes
+    try:
+        subprocess.run(
+            ["git", "update-ref", "-m", "unfck: rewrite commit messages", "HEAD", new_shas.get(head, head), head],
+            check=True, capture_output=True, text=True
+        )
+    except subprocess.CalledProcessError as e:
+        raise ValueError(
+            f"HEAD moved away from {head[:7]} during the rewrite, nothing was changed ({e.stderr.strip()})"
+        ) from e
+    finally:
+        _head_sha.cache_clear()
+
+
+def _rewrite_messages(messages: Dict[str, str]) -> bool:
+    """Rewrite commit messages by replaying history, falling back to git filter-branch."""
+    try:
+        _replay_with_messages(messages)
+        return True
+    
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    
+    except subprocess.CalledProcessError as e:
+        print(f"Replaying commits failed (exit code {e.returncode}), falling back to git filter-branch")
+        if e.stderr:
+            print(f"Standard error: {e.stderr}")
+        return _filter_branch_messages(messages)
+    
+    except Exception as e:
+        print(f"Unexpected error rewriting commit messages: {e}")
+        return False
+
+
 def rewrite_past_commit(commit_hash: str, new_message: str) -> bool:
-    """Rewrite a past commit message using git filter-branch."""
-    message_file = None
+    """Rewrite a past commit message by recreating it and its descendants."""
+    print(f"Rewriting past commit message for {commit_hash[:7]}...")
+    
+    if not _rewrite_messages({commit_hash: new_message}):
+        return False
+    
+    print(f"Successfully rewrote commit message for {commit_hash[:7]}")
+    return True
+
+
+def rewrite_commit_message(commit_hash: str, new_message: str) -> bool:
+    """
+    Rewrite a commit message.
+    
+    Uses different strategies based on whether the commit is the HEAD commit:
+    - For HEAD commit: Uses git commit --amend (simple, fast)
+    - For past commits: Recreates the commit and its descendants (non-interactive,
+      falling back to git filter-branch)
+    """
+    print(f"Preparing to rewrite commit message for {commit_hash[:7]}...")
     
     try:
-        print(f"Rewriting past commit message for {commit_hash[:7]} using git filter-branch...")
-        
-        # Create a temporary file for the commit message
-        message_file = os.path.join(os.getcwd(), ".git", "COMMIT_MSG")
-        with open(message_file, "w") as f:
-            f.write(new_message)
+        # Check if this is the HEAD commit
+        if is_head_commit(commit_hash):
+            return rewrite_head_commit(new_message)
+        else:
+            return rewrite_past_commit(commit_hash, new_message)
+    finally:
+        # HEAD has moved (or may have)
+        _head_sha.cache_clear()
+
+
+# Run by `git filter-branch --msg-filter`: prints the new message for commits
+# listed in UNFCK_MESSAGES and passes every other message through unchanged
+_MSG_FILTER_SCRIPT = (
+    "import json, os, sys; "
+    "messages = json.load(open(os.environ['UNFCK_MESSAGES'], encoding='utf-8')); "
+    "message = messages.get(os.environ['GIT_COMMIT']); "
+    "sys.stdout.buffer.write(sys.stdin.buffer.read() if message is None else message.encode('utf-8'))"
+)
+
+
+def rewrite_commit_messages_batch(messages: Dict[str, str]) -> bool:
+    """
+    Rewrite several commit messages, given as {commit hash: new message}.
+    
+    Rewriting commits one by one re-walks history each time and changes the
+    hashes of all later commits, so everything is applied in a single pass
+    over the oldest commit's descendants.
+    """
+    if not messages:
+        return True
+    
+    # A single message can use the cheaper per-commit strategies
+    if len(messages) == 1:
+        [(commit_hash, new_message)] = messages.items()
+        return rewrite_commit_message(commit_hash, new_message)
+    
+    print(f"Rewriting {len(messages)} commit messages in one pass...")
+    if not _rewrite_messages(messages):
+        return False
+    
+    print(f"Successfully rewrote {len(messages)} commit messages")
+    return True
+
+
+def _filter_branch_messages(messages: Dict[str, str]) -> bool:
+    """Rewrite commit messages, given by full hash, with one `git filter-branch` pass."""
+    try:
+        # The common ancestor of all targets is the oldest one when they are on one line
+        oldest = subprocess.run(
+            ["git", "merge-base", "--octopus", *messages],
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
         
         # Clean up any previous filter-branch backups to avoid errors
-        clean_filter_branch_backup()
+        delete_backup_refs()
         
-        # Create a filter command that replaces only the target commit's message
-        filter_cmd = f'if [ "$GIT_COMMIT" = "{commit_hash}" ]; then cat {message_file}; else cat; fi'
+        filter_cmd = f"{shlex.quote(sys.executable)} -c {shlex.quote(_MSG_FILTER_SCRIPT)}"
+        filter_branch_cmd = ["git", "filter-branch", "--force", "--msg-filter", filter_cmd]
         
-        # Check if this is the root commit (first commit in the repository)
-        is_root = is_root_commit(commit_hash)
-        
-        # Prepare the filter-branch command
-        filter_branch_cmd = [
-            "git", "filter-branch", "--force", "--msg-filter", 
-            filter_cmd
-        ]
-        
-        # For root commits, we need to use a different approach
-        if is_root:
-            print(f"Detected root commit {commit_hash[:7]}, using special root handling")
-            # For root commits, we need to use -- --all
+        # For root commits, we need to use -- --all
+        if is_root_commit(oldest):
             filter_branch_cmd.extend(["--", "--all"])
         else:
-            # For non-root commits, use the specific range
-            filter_branch_cmd.extend([f"{commit_hash}^..HEAD"])
-        
-        # Use git filter-branch to rewrite the message (non-interactive)
-        result = subprocess.run(
-            filter_branch_cmd,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+            filter_branch_cmd.extend([f"{oldest}^..HEAD"])
+        
+        # The messages go through a file: a single environment variable is
+        # limited to 128 KiB on Linux, which a big batch easily exceeds
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", suffix=".json", delete=False
+        ) as messages_file:
+            json.dump(messages, messages_file)
+        try:
+            result = subprocess.run(
+                filter_branch_cmd,
+                check=True,
+                capture_output=True,
+                text=True,
+                env={
+                    **os.environ,
+                    "UNFCK_MESSAGES": messages_file.name,
+                    "FILTER_BRANCH_SQUELCH_WARNING": "1",
+                },
+            )
+        finally:
+            os.unlink(messages_file.name)
+            _head_sha.cache_clear()
         
         if result.stdout:
             print(f"Filter-branch output: {result.stdout}")
-        
-        # Clean up
-        if os.path.exists(message_file):
-            os.remove(message_file)
-        
-        print(f"Successfully rewrote commit message for {commit_hash[:7]}")
         return True
     
     except subprocess.CalledProcessError as e:
@@ -306,55 +842,36 @@ def rewrite_past_commit(commit_hash: str, new_message: str) -> bool:
             print(f"Standard output: {e.stdout}")
         if e.stderr:
             print(f"Standard error: {e.stderr}")
-        
-        # Clean up any temporary files
-        if message_file and os.path.exists(message_file):
-            os.remove(message_file)
-        
         return False
     
     except Exception as e:
-        print(f"Unexpected error rewriting past commit message: {e}")
-        
-        # Clean up any temporary files
-        if message_file and os.path.exists(message_file):
-            os.remove(message_file)
-        
+        print(f"Unexpected error rewriting commit messages: {e}")
         return False
 
 
-def rewrite_commit_message(commit_hash: str, new_message: str) -> bool:
-    """
-    Rewrite a commit message.
-    
-    Uses different strategies based on whether the commit is the HEAD commit:
-    - For HEAD commit: Uses git commit --amend (simple, fast)
-    - For past commits: Uses git filter-branch (more complex but non-interactive)
-    """
-    print(f"Preparing to rewrite commit message for {commit_hash[:7]}...")
-    
-    # Check if this is the HEAD commit
-    if is_head_commit(commit_hash):
-        return rewrite_head_commit(new_message)
-    else:
-        return rewrite_past_commit(commit_hash, new_message)
-
-
 def is_shared_branch() -> bool:
     """Check if the current branch is shared with a remote repository."""
+    return _is_shared_branch(os.getcwd())
+
+
+@lru_cache(maxsize=1)
+def _is_shared_branch(cwd: str) -> bool:
+    """Check for the current branch of cwd on any remote; cached for the rest of the run."""
     try:
-        repo = git.Repo(os.getcwd())
-        branch_name = repo.active_branch.name
-        
-        # Check if the branch exists on any remote
-        for remote in repo.remotes:
-            remote_refs = [ref.name for ref in remote.refs]
-            if f"refs/remotes/{remote.name}/{branch_name}" in remote_refs:
-                return True
+        branch_name, _ = _probe()
+        if branch_name is None:
+            # A detached HEAD is not on any branch
+            return False
         
-        return False
+        # One for-each-ref call matches the branch on every remote at once,
+        # stopping at the first match
+        result = subprocess.run(
+            ["git", "for-each-ref", "--count=1", "--format=.", f"refs/remotes/*/{branch_name}"],
+            capture_output=True, text=True, check=True
+        )
+        return bool(result.stdout.strip())
     
-    except git.GitCommandError:
+    except subprocess.CalledProcessError:
         # If there's an error, assume it's not shared to be safe
         return False
     except Exception:
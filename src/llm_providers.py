@@ -1,9 +1,107 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import math
+import atexit
 import json
+import time
+import sqlite3
+import hashlib
+import threading
+import fnmatch
 import requests
-from typing import Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+
+class _PromptCache:
+    """
+    Cache of LLM responses in SQLite.
+    
+    Keys cover everything the prompt is built from: the diff, original message,
+    reason and model, plus a context string for the settings that shape the
+    prompt (the diff budget and the history the examples are drawn from). A
+    response is reused whenever all of them match, e.g. when re-running over an
+    overlapping commit range. Responses older than `ttl` seconds (if positive)
+    are treated as missing and pruned when the cache is opened.
+    """
+    
+    def __init__(self, path: str = ":memory:", ttl: int = 0):
+        """Open (and create if needed) the cache database at `path`."""
+        self.ttl = ttl
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        
+        # Shared by the threads generating messages concurrently
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT, model TEXT, ts INTEGER)"
+            )
+            if ttl > 0:
+                self._conn.execute("DELETE FROM responses WHERE ts < ?", (self._oldest(),))
+    
+    def _oldest(self) -> int:
+        """Get the oldest timestamp still considered fresh."""
+        return int(time.time()) - self.ttl if self.ttl > 0 else 0
+    
+    @staticmethod
+    def key(diff: str, original_message: str, reason: Optional[str], model: str, context: str = "") -> str:
+        """Get the cache key for a prompt's inputs."""
+        data = f"{model}\x00{context}\x00{original_message}\x00{reason or ''}\x00{diff}"
+        return hashlib.blake2b(data.encode("utf-8", "replace"), digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None on a miss."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response FROM responses WHERE key = ? AND ts >= ?",
+                    (key, self._oldest()),
+                ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None
+    
+    def put(self, key: str, response: str, model: str) -> None:
+        """Store a response."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, model, ts) VALUES (?, ?, ?, ?)",
+                    (key, response, model, int(time.time())),
+                )
+        except sqlite3.Error:
+            pass
+
+
+def _cache_path() -> Path:
+    """Get the path of the on-disk response cache."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "git-msg-unfck" / "responses.sqlite"
+
+
+# Default age in days after which cached responses are no longer used (0 = never)
+CACHE_TTL_DAYS = 30
+
+
+@lru_cache(maxsize=2)
+def _get_cache(persistent: bool = True, ttl_days: int = CACHE_TTL_DAYS) -> _PromptCache:
+    """Get the response cache, kept in memory only when `persistent` is False."""
+    if persistent:
+        try:
+            return _PromptCache(str(_cache_path()), ttl_days * 86400)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Could not open response cache, not caching to disk: {e}")
+    return _PromptCache()
 
 
 class OpenRouterClient:
@@ -16,22 +114,34 @@ class OpenRouterClient:
             raise ValueError("OpenRouter API key is required")
         
         self.base_url = "https://openrouter.ai/api/v1"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": "https://github.com/yourusername/git-msg-unfck",
+            "X-Title": "git-msg-unfck"
+        }
+        
+        # One session for all calls, so the TLS connection to OpenRouter is reused
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        
+        # Retry rate limits and transient server errors (POST included). Once
+        # retries run out the last response is returned rather than raised, so
+        # its status and body are still reported
+        retries = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries))
     
     def get_available_models(self) -> Dict[str, Any]:
         """Get a list of available models from OpenRouter."""
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-                "HTTP-Referer": "https://github.com/yourusername/git-msg-unfck",
-                "X-Title": "git-msg-unfck"
-            }
-            
             print("[OpenRouter] Getting available models...")
-            response = requests.get(
-                f"{self.base_url}/models",
-                headers=headers,
-            )
+            response = self.session.get(f"{self.base_url}/models")
             
             if response.status_code == 200:
                 models = response.json()
@@ -52,38 +162,41 @@ class OpenRouterClient:
         model: str = "gpt-4",
         temperature: float = 0.7,
         max_tokens: int = 500,
+        stream: bool = False,
     ) -> Optional[str]:
-        """Generate a message using the specified model."""
+        """
+        Generate a message using the specified model.
+        
+        With stream=True the message is printed as it is generated, and
+        Ctrl-C stops the generation.
+        """
         try:
-            # Prepare headers with model included
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-                "HTTP-Referer": "https://github.com/yourusername/git-msg-unfck",
-                "X-Title": "git-msg-unfck",
-                "model": model
-            }
-            
             # Prepare payload
             payload = {
-                "model": model,  # Model specified in both headers and payload
+                "model": model,
                 "messages": [
-                    {"role": "system", "content": "You are a senior software engineer with expertise in writing clear, concise, and informative Git commit messages."},
+                    system_message(model),
                     {"role": "user", "content": prompt},
                 ],
                 "temperature": temperature,
                 "max_tokens": max_tokens,
+                "stream": stream,
             }
             
             print(f"[OpenRouter] Sending request to model: {model}")
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers=headers,
                 json=payload,
+                stream=stream,
             )
             
             # Check response status
-            if response.status_code == 200:
+            if response.status_code == 200 and stream:
+                content = self._read_stream(response)
+                if content is not None:
+                    print(f"[OpenRouter] Successfully generated message ({len(content)} chars)")
+                return content
+            elif response.status_code == 200:
                 result = response.json()
                 if "choices" in result and len(result["choices"]) > 0:
                     content = result["choices"][0]["message"]["content"].strip()
@@ -104,41 +217,389 @@ class OpenRouterClient:
         except Exception as e:
             print(f"[OpenRouter] Unexpected error: {e}")
             return None
+    
+    def _read_stream(self, response: requests.Response) -> Optional[str]:
+        """Collect and print the content of a server-sent events completion."""
+        parts: List[str] = []
+        
+        # Event streams often have no charset, and iter_lines would yield bytes
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        
+        try:
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    # Skip keep-alive comments and blank separator lines
+                    if not line or not line.startswith("data:"):
+                        continue
+                    
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        print(delta, end="", flush=True)
+        
+        except KeyboardInterrupt:
+            print("\n[OpenRouter] Generation cancelled")
+            return None
+        
+        print()
+        if not parts:
+            print("[OpenRouter] No content in streamed response")
+            return None
+        return "".join(parts).strip()
+    
+    def close(self) -> None:
+        """Close the session and its pooled connections."""
+        self.session.close()
+
+
+# Shared by every call, so the session and its open connections are reused
+_client: Optional[OpenRouterClient] = None
+
+
+def get_client(api_key: Optional[str] = None) -> OpenRouterClient:
+    """Get the shared OpenRouter client, creating it on first use or when the key changes."""
+    global _client
+    if _client is None or (api_key and api_key != _client.api_key):
+        if _client is not None:
+            _client.close()
+        _client = OpenRouterClient(api_key)
+    return _client
+
+
+@atexit.register
+def close_client() -> None:
+    """Close the shared client's connections, if one was created."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+# Default size limits for the diff sent to the LLM
+MAX_DIFF_CHARS = 8000
+MAX_LINES_PER_FILE = 120
+
+# Files whose changes say little about the intent of a commit
+_NOISY_FILES = (
+    "*.lock", "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock",
+    "*.min.js", "*.min.css", "*.map",
+    "vendor/*", "*/vendor/*", "node_modules/*", "*/node_modules/*", "third_party/*",
+)
+
+
+def _is_noisy_file(path: str) -> bool:
+    """Check if a file's diff should be left out of the prompt."""
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in _NOISY_FILES)
+
+
+def shrink_diff(
+    diff: str,
+    max_chars: int = MAX_DIFF_CHARS,
+    max_lines_per_file: int = MAX_LINES_PER_FILE,
+) -> str:
+    """
+    Shrink a diff that is longer than max_chars.
+    
+    Each file keeps its header and max_lines_per_file lines of its hunks,
+    mostly from the start but also from the end, where the last hunk often
+    shows how a change is finished off or used. Lock files, minified and
+    vendored files, and binary changes keep only their header. If the result
+    is still too long, a summary of the added and removed lines per file is
+    put first and the diff is cut off.
+    """
+    if len(diff) <= max_chars:
+        return diff
+    
+    kept: List[str] = []
+    summary: List[str] = []
+    for chunk in re.split(r"^(?=diff --git )", diff, flags=re.MULTILINE):
+        if not chunk:
+            continue
+        
+        lines = chunk.rstrip("\n").split("\n")
+        header_end = next((i for i, line in enumerate(lines) if line.startswith("@@")), len(lines))
+        header, body = lines[:header_end], lines[header_end:]
+        path = header[0].rsplit(" b/", 1)[-1] if header[0].startswith("diff --git ") else ""
+        
+        added = sum(1 for line in body if line.startswith("+"))
+        removed = sum(1 for line in body if line.startswith("-"))
+        summary.append(f" {path} | +{added} -{removed}")
+        
+        if _is_noisy_file(path) or any(line.startswith("Binary files") for line in header):
+            kept.extend(header)
+            if body:
+                kept.append(f"... ({len(body)} lines of changes omitted) ...")
+        elif len(body) > max_lines_per_file:
+            tail_count = max_lines_per_file // 6
+            head_count = max_lines_per_file - tail_count
+            elided = body[head_count:len(body) - tail_count]
+            kept.extend(header + body[:head_count])
+            kept.append(f"... ({len(elided)} lines elided) ...")
+            
+            # Repeat the header of the hunk the tail is part of, so its position is known
+            hunk = next((line for line in reversed(elided) if line.startswith("@@")), None)
+            if hunk:
+                kept.append(hunk)
+            kept.extend(body[len(body) - tail_count:])
+        else:
+            kept.extend(lines)
+    
+    shrunk = "\n".join(kept)
+    if len(shrunk) <= max_chars:
+        return shrunk
+    
+    # Still too long: lead with the per-file summary and fill the rest with the diff
+    stat = "Changed files:\n" + "\n".join(summary)
+    room = max_chars - len(stat)
+    if room <= 0:
+        return stat
+    head = shrunk[:room].rsplit("\n", 1)[0]
+    return f"{stat}\n\n{head}\n... (diff truncated) ..."
+
+
+# The same for every request, and sent before anything commit-specific, so
+# providers with prompt caching can reuse it across commits
+_SYSTEM_PROMPT = (
+    "You are a senior software engineer with expertise in writing clear, concise, and informative "
+    "Git commit messages. Rewrite the Git commit message you are given based on its diff and context.\n"
+    "\n"
+    "Respond only with the improved commit message. Follow these guidelines:\n"
+    "1. Be concise but descriptive\n"
+    '2. Start with a verb in the present tense (e.g., "Add", "Fix", "Update")\n'
+    "3. Explain what changed and why, if apparent from the diff\n"
+    "4. Keep it under 72 characters for the first line\n"
+    "5. You may add a more detailed explanation after a blank line if necessary\n"
+)
+
+
+def system_message(model: str) -> Dict[str, Any]:
+    """
+    Get the system message for a model.
+    
+    Anthropic models only cache prompts at explicit breakpoints, so the system
+    prompt is marked as one for them; other providers cache identical
+    prefixes automatically.
+    """
+    if model.startswith("anthropic/") or "claude" in model.lower():
+        return {
+            "role": "system",
+            "content": [{"type": "text", "text": _SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+        }
+    return {"role": "system", "content": _SYSTEM_PROMPT}
+
+
+# The files a diff touches, as named on its "diff --git a/... b/..." lines
+_DIFF_PATHS = re.compile(r"^diff --git a/.*? b/(.*)$", re.MULTILINE)
+
+
+def _path_tokens(path: str) -> List[str]:
+    """Split a file path into the terms commits are compared by."""
+    tokens = [path, os.path.dirname(path), os.path.basename(path)]
+    tokens.extend(part.lower() for part in re.split(r"[/._\-]+", path))
+    return [token for token in tokens if token]
+
+
+class HistoryIndex:
+    """
+    TF-IDF index over the files changed by past commits.
+    
+    Finds earlier commits that touched the same or similar files, so their
+    messages can be shown to the LLM as examples of how this repository
+    describes such changes. `load` returns the (subject, paths) history and is
+    only called on the first lookup, so runs answered entirely from the cache
+    never read it. `fingerprint` identifies that history (e.g. by HEAD) and
+    becomes part of the response cache key.
+    """
+    
+    def __init__(self, load: Callable[[], List[Tuple[str, Tuple[str, ...]]]], k: int = 2, fingerprint: str = ""):
+        self.k = k
+        self.fingerprint = fingerprint
+        self._load = load
+        self._lock = threading.Lock()
+        self.history: Optional[List[Tuple[str, Tuple[str, ...]]]] = None
+        self.idf: Dict[str, float] = {}
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+    
+    def _build(self) -> None:
+        """Read the history and index it, once."""
+        with self._lock:
+            if self.history is not None:
+                return
+            history = list(self._load())
+            
+            documents: List[Dict[str, int]] = []
+            document_frequency: Dict[str, int] = {}
+            for _, paths in history:
+                counts: Dict[str, int] = {}
+                for path in paths:
+                    for token in _path_tokens(path):
+                        counts[token] = counts.get(token, 0) + 1
+                documents.append(counts)
+                for token in counts:
+                    document_frequency[token] = document_frequency.get(token, 0) + 1
+            
+            total = len(documents)
+            self.idf = {
+                token: math.log((total + 1) / (count + 1)) + 1
+                for token, count in document_frequency.items()
+            }
+            
+            # Normalized document vectors, stored per term for sparse scoring
+            for i, counts in enumerate(documents):
+                weights = {token: count * self.idf[token] for token, count in counts.items()}
+                norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+                for token, weight in weights.items():
+                    self.postings.setdefault(token, []).append((i, weight / norm))
+            self.history = history
+    
+    def retrieve(self, diff: str, original_message: str = "") -> List[Tuple[str, Tuple[str, ...]]]:
+        """Get up to k (subject, paths) examples for the commit with this diff, most similar first."""
+        if self.history is None:
+            self._build()
+        
+        query: Dict[str, float] = {}
+        for path in _DIFF_PATHS.findall(diff):
+            for token in _path_tokens(path):
+                if token in self.idf:
+                    query[token] = query.get(token, 0.0) + self.idf[token]
+        
+        scores: Dict[int, float] = {}
+        for token, weight in query.items():
+            for i, document_weight in self.postings[token]:
+                scores[i] = scores.get(i, 0.0) + weight * document_weight
+        
+        # Skip the commit being rewritten and repeats of the same subject
+        original_subject = original_message.split("\n", 1)[0].strip()
+        examples: List[Tuple[str, Tuple[str, ...]]] = []
+        seen = {original_subject}
+        for i in sorted(scores, key=lambda i: (-scores[i], i)):
+            subject, paths = self.history[i]
+            if subject in seen:
+                continue
+            seen.add(subject)
+            examples.append((subject, paths))
+            if len(examples) >= self.k:
+                break
+        return examples
+
+
+def _prompt_context(max_diff_chars: int, history: Optional[HistoryIndex]) -> str:
+    """Describe the prompt settings that the response cache key has to cover."""
+    if history is None or history.k <= 0:
+        return f"diff={max_diff_chars}"
+    return f"diff={max_diff_chars};examples={history.k}@{history.fingerprint}"
 
 
 def create_prompt(
     diff: str,
     original_message: str,
     reason: Optional[str] = None,
+    max_diff_chars: int = MAX_DIFF_CHARS,
+    history: Optional[HistoryIndex] = None,
 ) -> str:
-    """Create a prompt for the LLM to generate a new commit message."""
-    prompt = """You are a senior software engineer. Rewrite the following Git commit message based on the diff and context.
+    """Create the commit-specific prompt asking the LLM for a new commit message."""
+    # Joined once, so a large diff is only copied into the prompt a single time
+    parts = [
+        "Commit Diff:\n```\n",
+        shrink_diff(diff, max_diff_chars),
+        '\n```\n\nOriginal Message:\n"',
+        original_message,
+        '"\n',
+    ]
+    
+    if reason:
+        parts.extend([
+            '\nAdditional Context:\nThe developer indicated the goal of this commit was to "',
+            reason,
+            '".\n',
+        ])
+    
+    examples = history.retrieve(diff, original_message) if history else []
+    if examples:
+        parts.append("\nMessages of earlier commits in this repository that changed similar files, for style:\n")
+        for subject, paths in examples:
+            shown = ", ".join(paths[:3]) + (", ..." if len(paths) > 3 else "")
+            parts.append(f'- "{subject}" ({shown})\n')
+    
+    return "".join(parts)
+
+
+_BATCH_INSTRUCTIONS = (
+    'Rewrite the commit message of each of the following commits, which are introduced by "### Commit <i>".\n'
+    "\n"
+    'Instead of a single message, respond only with JSON of the form {"messages": [{"i": 0, "msg": "..."}]}, '
+    "with one entry per commit.\n"
+)
+
+
+def create_batch_prompt(
+    items: List[Tuple[str, str, Optional[str]]],
+    max_diff_chars: int = MAX_DIFF_CHARS,
+    history: Optional[HistoryIndex] = None,
+) -> str:
+    """Create one prompt asking for new messages for several (diff, original message, reason) items."""
+    parts = [_BATCH_INSTRUCTIONS]
+    for i, (diff, original_message, reason) in enumerate(items):
+        parts.extend([f"\n### Commit {i}\n", create_prompt(diff, original_message, reason, max_diff_chars, history)])
+    return "".join(parts)
 
-Commit Diff:
-```
-{diff}
-```
 
-Original Message:
-"{original_message}"
-""".format(diff=diff, original_message=original_message)
+def parse_batch_response(content: str, count: int) -> List[Optional[str]]:
+    """Get the messages from a response to a batch prompt, with None for any that are missing."""
+    results: List[Optional[str]] = [None] * count
+    try:
+        data = json.loads(content)
+    except ValueError:
+        # Models sometimes wrap the JSON in prose or a code block
+        match = re.search(r"\{.*\}", content, re.DOTALL)
+        if not match:
+            return results
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return results
     
-    if reason:
-        prompt += f"""
-Additional Context:
-The developer indicated the goal of this commit was to "{reason}".
-"""
+    entries = data.get("messages") if isinstance(data, dict) else None
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        i, message = entry.get("i"), entry.get("msg")
+        if isinstance(i, int) and 0 <= i < count and isinstance(message, str) and message.strip():
+            results[i] = message.strip()
+    return results
+
+
+def _generate_group(
+    client: OpenRouterClient,
+    group: List[Tuple[str, str, Optional[str]]],
+    model: str,
+    max_diff_chars: int,
+    history: Optional[HistoryIndex] = None,
+) -> List[Optional[str]]:
+    """
+    Generate messages for a group of items with a single request.
     
-    prompt += """
-Respond only with the improved commit message. Follow these guidelines:
-1. Be concise but descriptive
-2. Start with a verb in the present tense (e.g., "Add", "Fix", "Update")
-3. Explain what changed and why, if apparent from the diff
-4. Keep it under 72 characters for the first line
-5. You may add a more detailed explanation after a blank line if necessary
-"""
+    Items the model left out of a batch answer are retried with one request each.
+    """
+    if len(group) == 1:
+        return [client.generate_message(create_prompt(*group[0], max_diff_chars, history), model)]
     
-    return prompt
+    response = client.generate_message(create_batch_prompt(group, max_diff_chars, history), model, max_tokens=500 * len(group))
+    results = parse_batch_response(response or "", len(group))
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        print(f"[OpenRouter] Batch answer incomplete, requesting {len(missing)} messages separately")
+        for i in missing:
+            results[i] = client.generate_message(create_prompt(*group[i], max_diff_chars, history), model)
+    return results
 
 
 def get_improved_message(
@@ -147,13 +608,96 @@ def get_improved_message(
     reason: Optional[str] = None,
     model: str = "gpt-4",
     api_key: Optional[str] = None,
-) -> Optional[str]:
-    """Get an improved commit message from the LLM."""
+    use_cache: bool = True,
+    max_diff_chars: int = MAX_DIFF_CHARS,
+    cache_ttl_days: int = CACHE_TTL_DAYS,
+    history: Optional[HistoryIndex] = None,
+) -> Tuple[Optional[str], bool]:
+    """
+    Get an improved commit message from the LLM, reusing cached responses.
+    
+    Returns the message, or None, and whether it was already printed while
+    it was streamed from the LLM.
+    """
     try:
-        client = OpenRouterClient(api_key)
-        prompt = create_prompt(diff, original_message, reason)
-        return client.generate_message(prompt, model)
+        cache = _get_cache(use_cache, cache_ttl_days)
+        key = cache.key(diff, original_message, reason, model, _prompt_context(max_diff_chars, history))
+        cached = cache.get(key)
+        if cached is not None:
+            print("Using cached improved message")
+            return cached, False
+        
+        client = get_client(api_key)
+        prompt = create_prompt(diff, original_message, reason, max_diff_chars, history)
+        message = client.generate_message(prompt, model, stream=True)
+        if message:
+            cache.put(key, message, model)
+        return message, True
     
     except Exception as e:
         print(f"Error getting improved message: {e}")
-        return None
+        return None, False
+
+
+def iter_improved_messages(
+    items: List[Tuple[str, str, Optional[str]]],
+    model: str = "gpt-4",
+    api_key: Optional[str] = None,
+    concurrency: int = 4,
+    use_cache: bool = True,
+    max_diff_chars: int = MAX_DIFF_CHARS,
+    cache_ttl_days: int = CACHE_TTL_DAYS,
+    batch_size: int = 1,
+    history: Optional[HistoryIndex] = None,
+) -> Iterator[Optional[str]]:
+    """
+    Yield improved commit messages for (diff, original message, reason) items, in order.
+    
+    All requests are started up front and run concurrently; each message is
+    yielded as soon as it and the ones before it are ready. With
+    batch_size > 1, up to that many items share one request, which saves the
+    per-request overhead. With a history index, prompts include the messages
+    of similar past commits as examples.
+    """
+    cache = _get_cache(use_cache, cache_ttl_days)
+    context = _prompt_context(max_diff_chars, history)
+    keys = [cache.key(diff, original_message, reason, model, context) for diff, original_message, reason in items]
+    results = [cache.get(key) for key in keys]
+    
+    # Only ask the LLM for the ones not answered from the cache
+    misses = [i for i, result in enumerate(results) if result is None]
+    if len(misses) < len(items):
+        print(f"Using {len(items) - len(misses)} cached improved messages")
+    
+    executor = None
+    pending: Dict[int, Tuple[Future, int]] = {}
+    try:
+        if misses:
+            client = get_client(api_key)
+            size = batch_size if batch_size > 1 and len(misses) > 1 else 1
+            executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+            for start in range(0, len(misses), size):
+                group = misses[start:start + size]
+                future = executor.submit(_generate_group, client, [items[i] for i in group], model, max_diff_chars, history)
+                for position, i in enumerate(group):
+                    pending[i] = (future, position)
+    except Exception as e:
+        print(f"Error getting improved messages: {e}")
+    
+    try:
+        for i, result in enumerate(results):
+            if result is None and i in pending:
+                future, position = pending[i]
+                try:
+                    result = future.result()[position]
+                except Exception as e:
+                    print(f"Error getting improved message: {e}")
+                if result:
+                    cache.put(keys[i], result, model)
+            yield result
+    finally:
+        # Don't start requests nobody will read when iteration stops early
+        if executor is not None:
+            for future, _ in pending.values():
+                future.cancel()
+            executor.shutdown(wait=False)
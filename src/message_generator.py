@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import sys
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 try:
     from colorama import init, Fore, Style
@@ -11,8 +12,22 @@ try:
 except ImportError:
     COLOR_SUPPORT = False
 
-from .git_utils import get_commit_info, rewrite_commit_message, is_shared_branch
-from .llm_providers import get_improved_message
+from .git_utils import (
+    iter_commits_with_info, rewrite_commit_messages_batch, is_shared_branch,
+    get_recent_history, get_head_sha, reachable_from_head,
+)
+
+
+_COLORS: Dict[str, str] = {
+    "red": Fore.RED,
+    "green": Fore.GREEN,
+    "yellow": Fore.YELLOW,
+    "blue": Fore.BLUE,
+    "magenta": Fore.MAGENTA,
+    "cyan": Fore.CYAN,
+    "white": Fore.WHITE,
+    "reset": Style.RESET_ALL,
+} if COLOR_SUPPORT else {}
 
 
 def colorize(text: str, color: str) -> str:
@@ -20,18 +35,17 @@ def colorize(text: str, color: str) -> str:
     if not COLOR_SUPPORT:
         return text
     
-    colors = {
-        "red": Fore.RED,
-        "green": Fore.GREEN,
-        "yellow": Fore.YELLOW,
-        "blue": Fore.BLUE,
-        "magenta": Fore.MAGENTA,
-        "cyan": Fore.CYAN,
-        "white": Fore.WHITE,
-        "reset": Style.RESET_ALL,
-    }
-    
-    return f"{colors.get(color, '')}{text}{colors.get('reset', '')}"
+    return f"{_COLORS.get(color, '')}{text}{_COLORS['reset']}"
+
+
+# Labels printed for every commit, colored once up front
+_LABEL_COMMIT = colorize("Commit:", "cyan")
+_LABEL_AUTHOR = colorize("Author:", "cyan")
+_LABEL_ORIGINAL_MESSAGE = colorize("Original message:", "cyan")
+_LABEL_DIFF = colorize("Diff:", "cyan")
+_LABEL_ORIGINAL = colorize("Original:", "yellow")
+_LABEL_IMPROVED = colorize("Improved:", "green")
+_LABEL_ACCEPT = colorize("Accept?", "cyan")
 
 
 def prompt_for_reason(commit_hash: str) -> str:
@@ -40,6 +54,20 @@ def prompt_for_reason(commit_hash: str) -> str:
     return input("Why did you make this change? (optional): ").strip()
 
 
+def _head_and_count(text: str, n: int) -> Tuple[str, int]:
+    """Return the first n lines of text and how many lines follow them."""
+    # Find where the nth line ends without splitting the whole text
+    end = 0
+    for _ in range(n):
+        end = text.find("\n", end) + 1
+        if end == 0:
+            return text, 0
+    
+    # Count from the cut instead of copying the rest; an unterminated last line counts too
+    extra = text.count("\n", end) + (1 if len(text) > end and not text.endswith("\n") else 0)
+    return text[:end].rstrip("\n"), extra
+
+
 def display_commit_info(
     commit_hash: str,
     original_message: str,
@@ -48,29 +76,65 @@ def display_commit_info(
     show_diff: bool = True,
 ) -> None:
     """Display information about a commit."""
-    print(f"\n{colorize('Commit:', 'cyan')} {commit_hash[:7]}")
-    print(f"{colorize('Author:', 'cyan')} {author}")
-    print(f"{colorize('Original message:', 'cyan')} {original_message}")
+    print(f"\n{_LABEL_COMMIT} {commit_hash[:7]}")
+    print(f"{_LABEL_AUTHOR} {author}")
+    print(f"{_LABEL_ORIGINAL_MESSAGE} {original_message}")
     
     if show_diff:
-        print(f"\n{colorize('Diff:', 'cyan')}")
+        print(f"\n{_LABEL_DIFF}")
         # Limit diff to a reasonable size for display
-        max_diff_lines = 20
-        diff_lines = diff.split("\n")
-        if len(diff_lines) > max_diff_lines:
-            print("\n".join(diff_lines[:max_diff_lines]))
-            print(f"... {len(diff_lines) - max_diff_lines} more lines ...")
+        head, extra = _head_and_count(diff, 20)
+        if extra:
+            print(head)
+            print(f"... {extra} more lines ...")
         else:
             print(diff)
 
 
-def prompt_for_action(original_message: str, improved_message: str) -> str:
-    """Prompt the user for action on the improved message."""
-    print(f"\n{colorize('Original:', 'yellow')} {original_message}")
-    print(f"{colorize('Improved:', 'green')} {improved_message}")
+def _getch() -> str:
+    """Read a single keypress from the terminal without waiting for Enter."""
+    if os.name == "nt":
+        import msvcrt
+        return msvcrt.getwch()
+    
+    import termios
+    import tty
+    
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    try:
+        tty.setraw(fd)
+        return sys.stdin.read(1)
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+
+def read_choice(prompt: str) -> str:
+    """Ask for a one-letter choice, answered with a single keypress on a terminal."""
+    if not sys.stdin.isatty():
+        return input(prompt).lower()
+    
+    print(prompt, end="", flush=True)
+    key = _getch()
+    # Raw mode delivers Ctrl-C as a character instead of a signal
+    if key == "\x03":
+        print()
+        raise KeyboardInterrupt
+    print(key if key.isprintable() else "")
+    return key.lower()
+
+
+def prompt_for_action(original_message: str, improved_message: str, streamed: bool = False) -> str:
+    """
+    Prompt the user for action on the improved message.
+    
+    A message that was streamed has just been printed, so it is not repeated.
+    """
+    print(f"\n{_LABEL_ORIGINAL} {original_message}")
+    print(_LABEL_IMPROVED if streamed else f"{_LABEL_IMPROVED} {improved_message}")
     
     while True:
-        choice = input(f"\n{colorize('Accept?', 'cyan')} [y/n/e=edit/s=skip]: ").lower()
+        choice = read_choice(f"\n{_LABEL_ACCEPT} [y/n/e=edit/s=skip]: ")
         if choice in ["y", "n", "e", "s"]:
             return choice
         print("Invalid choice. Please enter y, n, e, or s.")
@@ -84,8 +148,48 @@ def clean_message(message: str) -> str:
     return message
 
 
+# Subjects in the conventional-commit style, e.g. "fix(parser): handle empty input"
+_GOOD_PREFIX = re.compile(
+    r"^(feat|fix|chore|docs|refactor|test|perf|style|build|ci)(\([\w-]+\))?!?:\s.+",
+    re.IGNORECASE,
+)
+
+# Subject lines that never describe the change, whatever their length
+_LOW_EFFORT = frozenset({"", "fix", "stuff", "asdf", "wip", "update", "changes", "tmp"})
+
+
+def needs_improvement(message: str) -> bool:
+    """Cheap check for whether a commit message is worth sending to the AI model."""
+    message = message.strip()
+    if message.split("\n", 1)[0].lower() in _LOW_EFFORT:
+        return True
+    if len(message) < 20:
+        return True
+    return not _GOOD_PREFIX.match(message)
+
+
+def _edit_inline(message: str) -> Optional[str]:
+    """Edit a one-line message in place at the prompt, or None if readline is unavailable."""
+    try:
+        import readline
+    except ImportError:
+        return None
+    
+    readline.set_startup_hook(lambda: readline.insert_text(message))
+    try:
+        return input("Edit: ").strip() or message
+    finally:
+        readline.set_startup_hook()
+
+
 def edit_message(message: str) -> str:
     """Allow the user to edit a message."""
+    # Single-line messages are quicker to fix at the prompt than in an editor
+    if "\n" not in message and sys.stdin.isatty():
+        edited_message = _edit_inline(message)
+        if edited_message is not None:
+            return edited_message
+    
     # Create a temporary file with the message
     import tempfile
     import subprocess
@@ -94,20 +198,21 @@ def edit_message(message: str) -> str:
         f.write(message)
         temp_file = f.name
     
-    # Open the file in the user's preferred editor
-    editor = os.environ.get("EDITOR", "vim")
     try:
-        subprocess.run([editor, temp_file], check=True)
-    except subprocess.CalledProcessError:
-        print("Error opening editor. Using default message.")
-        return message
-    
-    # Read the edited message
-    with open(temp_file, "r") as f:
-        edited_message = f.read().strip()
-    
-    # Clean up
-    os.unlink(temp_file)
+        # Open the file in the user's preferred editor
+        editor = os.environ.get("EDITOR", "vim")
+        try:
+            subprocess.run([editor, temp_file], check=True)
+        except (subprocess.CalledProcessError, OSError):
+            print("Error opening editor. Using default message.")
+            return message
+        
+        # Read the edited message
+        with open(temp_file, "r") as f:
+            edited_message = f.read().strip()
+    finally:
+        # Clean up
+        os.unlink(temp_file)
     
     return edited_message
 
@@ -120,15 +225,42 @@ def process_commits(
     model: str = "gpt-4",
     dry_run: bool = False,
     config: Dict[str, Any] = None,
+    use_cache: bool = True,
 ) -> None:
     """Process a list of commits to improve their messages."""
     if not commit_hashes:
         print("No commits to process")
         return
     
+    # Commits on other branches can't be rewritten, so don't ask the LLM about them
+    reachable = reachable_from_head(commit_hashes)
+    if len(reachable) < len(commit_hashes):
+        skipped = [commit_hash[:7] for commit_hash in commit_hashes if commit_hash not in reachable]
+        print(colorize(f"Warning: Skipping commits not in the current branch: {', '.join(skipped)}", "yellow"))
+        commit_hashes = reachable
+        if not commit_hashes:
+            print("No commits to process")
+            return
+    
+    # requests and the cache are only needed once there is work to do
+    from .llm_providers import HistoryIndex, get_improved_message, iter_improved_messages
+    
+    # Read settings once rather than on every commit
+    config = config or {}
+    behavior = config.get("behavior", {})
+    show_diff = behavior.get("show_diff", True)
+    remove_quotes = behavior.get("remove_quotes", True)
+    max_diff_chars = behavior.get("max_diff_chars", 8000)
+    cache_ttl_days = behavior.get("cache_ttl_days", 30)
+    batch_size = behavior.get("batch_size", 8)
+    parallel_llm = behavior.get("parallel_llm", True)
+    skip_good_messages = behavior.get("skip_good_messages", False)
+    few_shot_examples = behavior.get("few_shot_examples", 2)
+    api_key = config.get("provider", {}).get("api_key")
+    
     # Check if we're operating on a shared branch
     if (
-        config.get("behavior", {}).get("warn_on_shared_branches", True)
+        behavior.get("warn_on_shared_branches", True)
         and not dry_run
         and not auto_apply
         and is_shared_branch()
@@ -139,35 +271,79 @@ def process_commits(
             "Consider creating a new branch first.",
             "yellow"
         ))
-        choice = input("Continue? [y/N]: ").lower()
+        choice = read_choice("Continue? [y/N]: ")
         if choice != "y":
             print("Aborting.")
             return
     
-    # Get the API key from config
-    api_key = config.get("provider", {}).get("api_key")
-    
     # Get a global reason if ask_why is true and we have multiple commits
     shared_reason = global_why
     if ask_why and len(commit_hashes) > 1:
         print(f"\nCommit: {commit_hashes[0][:7]} (and {len(commit_hashes)-1} more)")
         shared_reason = input("Why did you make these changes? (optional): ").strip()
     
+    # Messages of past commits to similar files show the model this repository's style;
+    # ones that are themselves in need of fixing would only be bad examples. The
+    # history is only read once a prompt is actually built, i.e. on a cache miss
+    history = None
+    if few_shot_examples > 0:
+        history = HistoryIndex(
+            lambda: [
+                (subject, paths) for subject, paths in get_recent_history()
+                if len(subject) >= 20 and subject.lower() not in _LOW_EFFORT
+            ],
+            k=few_shot_examples,
+            fingerprint=get_head_sha(),
+        )
+    
+    # Accepted messages are collected and applied in one history rewrite at
+    # the end, since rewriting a commit changes the hashes of all later ones
+    new_messages: Dict[str, str] = {}
+    
+    # Read all commit information in one pass
+    commits = iter_commits_with_info(commit_hashes)
+    
+    # Without prompts between commits, all messages can be requested up front
+    # in parallel instead of waiting on the LLM once per commit; each commit
+    # is then reported as soon as its message (and those before it) arrive
+    prefetched: Optional[Iterator[Optional[str]]] = None
+    if auto_apply and parallel_llm and len(commit_hashes) > 1:
+        commits = list(commits)
+        items = [
+            (diff, message, shared_reason)
+            for _, message, _, diff in commits
+            if message and diff and (not skip_good_messages or needs_improvement(message))
+        ]
+        print(f"\nGenerating {len(items)} improved messages using {model}...")
+        prefetched = iter_improved_messages(
+            items,
+            model,
+            api_key,
+            use_cache=use_cache,
+            max_diff_chars=max_diff_chars,
+            cache_ttl_days=cache_ttl_days,
+            batch_size=batch_size,
+            history=history,
+        )
+    
     # Process each commit
-    for commit_hash in commit_hashes:
-        # Get commit information
-        original_message, author, diff = get_commit_info(commit_hash)
+    for commit_hash, original_message, author, diff in commits:
         if not original_message or not diff:
             print(f"Error: Could not get information for commit {commit_hash[:7]}")
             continue
         
+        # Leave messages that already look fine alone, without asking the AI model
+        if skip_good_messages and not needs_improvement(original_message):
+            print(f"\n{_LABEL_COMMIT} {commit_hash[:7]} {colorize('already has a good message, skipping', 'yellow')}")
+            continue
+        
         # Display commit information
         display_commit_info(
             commit_hash,
             original_message,
             author,
             diff,
-            show_diff=config.get("behavior", {}).get("show_diff", True),
+            show_diff=show_diff,
         )
         
         # Get the reason for the commit
@@ -179,22 +355,33 @@ def process_commits(
             reason = shared_reason
         
         # Generate improved message
-        print(f"\nGenerating improved message using {model}...")
-        improved_message = get_improved_message(
-            diff,
-            original_message,
-            reason,
-            model,
-            api_key,
-        )
+        streamed = False
+        if prefetched is not None:
+            improved_message = next(prefetched)
+        else:
+            print(f"\nGenerating improved message using {model}...")
+            improved_message, streamed = get_improved_message(
+                diff,
+                original_message,
+                reason,
+                model,
+                api_key,
+                use_cache=use_cache,
+                max_diff_chars=max_diff_chars,
+                cache_ttl_days=cache_ttl_days,
+                history=history,
+            )
         
         if not improved_message:
             print(colorize("Error: Could not generate improved message", "red"))
             continue
         
-        # Clean the message by removing unnecessary quotes if configured
-        if config.get("behavior", {}).get("remove_quotes", True):
-            improved_message = clean_message(improved_message)
+        # Clean the message by removing unnecessary quotes if configured;
+        # if that changed it, the streamed text is no longer what is applied
+        if remove_quotes:
+            cleaned = clean_message(improved_message)
+            streamed = streamed and cleaned == improved_message
+            improved_message = cleaned
         
         # Handle the improved message
         if auto_apply:
@@ -202,34 +389,25 @@ def process_commits(
                 print(f"\n{colorize('Would apply:', 'green')} {improved_message}")
             else:
                 print(f"\n{colorize('Applying:', 'green')} {improved_message}")
-                if rewrite_commit_message(commit_hash, improved_message):
-                    print(colorize("Successfully rewrote commit message", "green"))
-                else:
-                    print(colorize("Error: Failed to rewrite commit message", "red"))
+                new_messages[commit_hash] = improved_message
         else:
-            action = prompt_for_action(original_message, improved_message)
+            action = prompt_for_action(original_message, improved_message, streamed)
             
             if action == "y":
                 if dry_run:
                     print(colorize("Would apply the improved message", "green"))
                 else:
-                    if rewrite_commit_message(commit_hash, improved_message):
-                        print(colorize("Successfully rewrote commit message", "green"))
-                    else:
-                        print(colorize("Error: Failed to rewrite commit message", "red"))
+                    new_messages[commit_hash] = improved_message
             
             elif action == "e":
                 edited_message = edit_message(improved_message)
                 # Clean the edited message as well if configured
-                if config.get("behavior", {}).get("remove_quotes", True):
+                if remove_quotes:
                     edited_message = clean_message(edited_message)
                 if dry_run:
                     print(f"\n{colorize('Would apply edited message:', 'green')} {edited_message}")
                 else:
-                    if rewrite_commit_message(commit_hash, edited_message):
-                        print(colorize("Successfully rewrote commit message", "green"))
-                    else:
-                        print(colorize("Error: Failed to rewrite commit message", "red"))
+                    new_messages[commit_hash] = edited_message
             
             elif action == "n":
                 print(colorize("Keeping original message", "yellow"))
@@ -237,4 +415,11 @@ def process_commits(
             elif action == "s":
                 print(colorize("Skipping this commit", "yellow"))
     
+    if new_messages:
+        print()
+        if rewrite_commit_messages_batch(new_messages):
+            print(colorize("Successfully rewrote commit messages", "green"))
+        else:
+            print(colorize("Error: Failed to rewrite commit messages", "red"))
+    
     print("\nDone!")
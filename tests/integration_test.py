@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import os
+import hashlib
 import shutil
 import subprocess
 import tempfile
@@ -8,6 +9,59 @@ import unittest
 import argparse
 from pathlib import Path
 
+# Files of the test commits, each with a poor message, as (message, {path: content})
+TEST_COMMITS = [
+    ("stuff", {"file1.txt": "Initial content"}),
+    ("fix", {"file1.txt": "Initial content\nMore content with a bug fix"}),
+    ("asdf", {"file2.txt": "Another file with important functionality"}),
+]
+
+
+def fast_import_stream(commits) -> bytes:
+    """Build a `git fast-import` stream that creates the commits on refs/heads/main."""
+    def data(text: str) -> str:
+        return f"data {len(text.encode())}\n{text}\n"
+    
+    parts = []
+    for n, (message, files) in enumerate(commits):
+        timestamp = 1700000000 + n * 60
+        parts.append(f"commit refs/heads/main\ncommitter Test User <test@example.com> {timestamp} +0000\n")
+        parts.append(data(message))
+        for path, content in files.items():
+            parts.append(f"M 100644 inline {path}\n")
+            parts.append(data(content))
+        parts.append("\n")
+    return "".join(parts).encode()
+
+
+# Creates the test repository in a single shell: the commits are read by
+# fast-import from stdin, then checked out so the index and files match HEAD
+_SETUP_SCRIPT = """
+set -e
+git init -q
+git symbolic-ref HEAD refs/heads/main
+git config user.name "Test User"
+git config user.email "test@example.com"
+git fast-import --quiet
+git reset -q --hard
+"""
+
+# Digest of the dependency files from the last successful `poetry install`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INSTALL_STAMP = PROJECT_ROOT / ".unfck-test-cache" / "lockhash"
+
+
+def dependency_hash() -> str:
+    """Hash pyproject.toml and poetry.lock, the inputs to `poetry install`."""
+    digest = hashlib.sha256()
+    for name in ("pyproject.toml", "poetry.lock"):
+        path = PROJECT_ROOT / name
+        if path.exists():
+            digest.update(name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
 class GitMsgUnfckIntegrationTest(unittest.TestCase):
     def setUp(self):
         # Get API key from environment or argument
@@ -17,53 +71,27 @@ class GitMsgUnfckIntegrationTest(unittest.TestCase):
         
         # Create a temporary directory for the test repository
         self.test_dir = tempfile.mkdtemp()
-        self.old_dir = os.getcwd()
-        
-        # Initialize a new Git repository
-        os.chdir(self.test_dir)
-        subprocess.run(["git", "init"], check=True)
-        subprocess.run(["git", "config", "user.name", "Test User"], check=True)
-        subprocess.run(["git", "config", "user.email", "test@example.com"], check=True)
         
-        # Create test files and make commits with poor messages
-        self._create_test_commits()
+        # Initialize a new Git repository with test commits
+        subprocess.run(
+            ["sh", "-c", _SETUP_SCRIPT],
+            input=fast_import_stream(TEST_COMMITS),
+            check=True,
+            cwd=self.test_dir,
+        )
         
         # Path to the project directory
-        self.project_dir = self.old_dir
+        self.project_dir = os.getcwd()
     
     def tearDown(self):
         # Clean up
-        os.chdir(self.old_dir)
         shutil.rmtree(self.test_dir)
     
-    def _create_test_commits(self):
-        # Create a file and make a commit with a poor message
-        with open("file1.txt", "w") as f:
-            f.write("Initial content")
-        
-        subprocess.run(["git", "add", "file1.txt"], check=True)
-        subprocess.run(["git", "commit", "-m", "stuff"], check=True)
-        
-        # Make another change and commit
-        with open("file1.txt", "a") as f:
-            f.write("\nMore content with a bug fix")
-        
-        subprocess.run(["git", "add", "file1.txt"], check=True)
-        subprocess.run(["git", "commit", "-m", "fix"], check=True)
-        
-        # Create another file and commit
-        with open("file2.txt", "w") as f:
-            f.write("Another file with important functionality")
-        
-        subprocess.run(["git", "add", "file2.txt"], check=True)
-        subprocess.run(["git", "commit", "-m", "asdf"], check=True)
-    
     def test_unfck_last_commit(self):
         """Test improving the last commit message."""
         print("\n\nTesting improvement of last commit message...")
         
         # Run unfck on the last commit with Claude 3.7 using Poetry
-        os.chdir(self.project_dir)  # Change to project directory to use Poetry
         result = subprocess.run(
             [
                 "poetry", "run", "unfck", 
@@ -72,10 +100,10 @@ class GitMsgUnfckIntegrationTest(unittest.TestCase):
                 "--model", "gpt-4"
             ],
             env={**os.environ, "OPENROUTER_API_KEY": self.api_key},
+            cwd=self.project_dir,  # Run from the project directory to use Poetry
             capture_output=True,
             text=True
         )
-        os.chdir(self.test_dir)  # Change back to test directory
         
         # Print the output for debugging
         print(f"Command output:\n{result.stdout}")
@@ -88,6 +116,7 @@ class GitMsgUnfckIntegrationTest(unittest.TestCase):
         # Get the new commit message
         log_result = subprocess.run(
             ["git", "log", "-1", "--pretty=%B"],
+            cwd=self.test_dir,
             capture_output=True,
             text=True,
             check=True
@@ -106,7 +135,6 @@ class GitMsgUnfckIntegrationTest(unittest.TestCase):
         print("\n\nTesting improvement with 'why' context...")
         
         # Run unfck on the second commit with a 'why' reason using Poetry
-        os.chdir(self.project_dir)  # Change to project directory to use Poetry
         result = subprocess.run(
             [
                 "poetry", "run", "unfck", 
@@ -116,10 +144,10 @@ class GitMsgUnfckIntegrationTest(unittest.TestCase):
                 "--why", "Fixing a critical bug in the authentication flow"
             ],
             env={**os.environ, "OPENROUTER_API_KEY": self.api_key},
+            cwd=self.project_dir,  # Run from the project directory to use Poetry
             capture_output=True,
             text=True
         )
-        os.chdir(self.test_dir)  # Change back to test directory
         
         # Print the output for debugging
         print(f"Command output:\n{result.stdout}")
@@ -132,6 +160,7 @@ class GitMsgUnfckIntegrationTest(unittest.TestCase):
         # Get the new commit message
         log_result = subprocess.run(
             ["git", "log", "-2", "--pretty=%B", "--skip=1"],
+            cwd=self.test_dir,
             capture_output=True,
             text=True,
             check=True
@@ -162,21 +191,28 @@ def main():
         print("Error: OpenRouter API key must be provided via --api-key or OPENROUTER_API_KEY env var")
         return 1
     
-    # Check if Poetry is installed
-    try:
-        subprocess.run(["poetry", "--version"], check=True, stdout=subprocess.PIPE)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Error: Poetry is not installed")
-        print("Please install Poetry: curl -sSL https://install.python-poetry.org | python3 -")
-        return 1
-    
-    # Ensure dependencies are installed
-    print("Ensuring dependencies are installed...")
-    try:
-        subprocess.run(["poetry", "install"], check=True)
-    except subprocess.CalledProcessError:
-        print("Error: Failed to install dependencies with Poetry")
-        return 1
+    # Skip the Poetry check and install when the dependencies haven't
+    # changed since the last successful install
+    lock_hash = dependency_hash()
+    if not (INSTALL_STAMP.exists() and INSTALL_STAMP.read_text() == lock_hash):
+        # Check if Poetry is installed
+        try:
+            subprocess.run(["poetry", "--version"], check=True, stdout=subprocess.PIPE)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            print("Error: Poetry is not installed")
+            print("Please install Poetry: curl -sSL https://install.python-poetry.org | python3 -")
+            return 1
+        
+        # Ensure dependencies are installed
+        print("Ensuring dependencies are installed...")
+        try:
+            subprocess.run(["poetry", "install"], check=True, cwd=PROJECT_ROOT)
+        except subprocess.CalledProcessError:
+            print("Error: Failed to install dependencies with Poetry")
+            return 1
+        
+        INSTALL_STAMP.parent.mkdir(exist_ok=True)
+        INSTALL_STAMP.write_text(lock_hash)
     
     unittest.main(argv=['first-arg-is-ignored'])
 
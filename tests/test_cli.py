@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import unittest
+from contextlib import redirect_stderr
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cli import fast_parse_args, parse_args
+
+
+class TestFastParseArgs(unittest.TestCase):
+    """Test cases for the argparse-free parsing of the common commands."""
+
+    def assert_rejected(self, args):
+        """Check that fast_parse_args leaves args to argparse, which reports a usage error."""
+        self.assertIsNone(fast_parse_args(args))
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(args)
+
+    def test_same_namespace_as_argparse(self):
+        """Test that fast_parse_args gives the same result as parse_args for the forms it handles."""
+        for args in [
+            ["last", "5"],
+            ["first", "3"],
+            ["."],
+            ["last", "2", "--just-fix-it", "--model", "gpt-4", "--why=Fix the login flow"],
+            [".", "--only-main", "--dry-run", "--no-cache"],
+        ]:
+            with self.subTest(args=args):
+                namespace = fast_parse_args(args)
+                self.assertIsNotNone(namespace)
+                self.assertEqual(vars(namespace), vars(parse_args(args)))
+
+    def test_no_arguments(self):
+        """Test that running without a command is left to argparse."""
+        self.assert_rejected([])
+
+    def test_invalid_count(self):
+        """Test that counts int() cannot parse are left to argparse instead of raising."""
+        for count in ["²", "five", ""]:
+            with self.subTest(count=count):
+                self.assert_rejected(["last", count] if count else ["last"])
+
+    def test_unknown_option(self):
+        """Test that unknown or conflicting options are left to argparse."""
+        self.assert_rejected(["last", "3", "--frobnicate"])
+        self.assert_rejected([".", "--all-branches", "--only-main"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,35 +1,52 @@
 #!/usr/bin/env python3
 
 import os
+import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.config import load_config, save_config, get_config_path
+from src.config import (
+    load_config, save_config, get_config_path, set_config_value,
+    _load_config_cached, _coerce, _parse_ini, _format_ini
+)
 
 
 class TestConfig(unittest.TestCase):
     """Test cases for the config module."""
     
+    def setUp(self):
+        # Config lookups are cached per process
+        get_config_path.cache_clear()
+        _load_config_cached.cache_clear()
+        
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_file = Path(self.temp_dir.name) / ".unfckrc"
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
     def test_get_config_path(self):
         """Test that get_config_path returns the correct path."""
         # Mock the existence of a local config file
-        with patch.object(Path, 'exists', return_value=True):
+        with patch('src.config.os.stat'):
             config_path = get_config_path()
             self.assertEqual(config_path, Path(".unfckrc"))
         
+        get_config_path.cache_clear()
+        
         # Mock the absence of a local config file
-        with patch.object(Path, 'exists', return_value=False):
+        with patch('src.config.os.stat', side_effect=FileNotFoundError):
             config_path = get_config_path()
             self.assertEqual(config_path, Path.home() / ".unfckrc")
     
     def test_load_config_defaults(self):
         """Test that load_config returns default values when no config file exists."""
-        # Mock the absence of a config file
-        with patch.object(Path, 'exists', return_value=False):
+        # Point to a config file that does not exist
+        with patch('src.config.get_config_path', return_value=self.config_file):
             config = load_config()
             
             # Check default values
@@ -52,9 +69,9 @@ auto_apply = true
 default_commit_count = 10
 """
         
-        # Mock the existence of a config file and its content
-        with patch.object(Path, 'exists', return_value=True), \
-             patch('builtins.open', mock_open(read_data=mock_config_content)):
+        self.config_file.write_text(mock_config_content)
+        
+        with patch('src.config.get_config_path', return_value=self.config_file):
             config = load_config()
             
             # Check loaded values
@@ -73,7 +90,7 @@ default_commit_count = 10
         }
         
         # Mock the absence of a config file and environment variables
-        with patch.object(Path, 'exists', return_value=False), \
+        with patch('src.config.get_config_path', return_value=self.config_file), \
              patch.dict(os.environ, env_vars, clear=True):
             config = load_config()
             
@@ -82,6 +99,52 @@ default_commit_count = 10
             self.assertEqual(config["provider"]["engine"], "gpt-4")
             self.assertEqual(config["defaults"]["auto_apply"], True)
     
+    def test_load_config_reloads_changed_file(self):
+        """Test that load_config picks up changes made to the config file."""
+        with patch('src.config.get_config_path', return_value=self.config_file):
+            self.config_file.write_text("[provider]\nengine = gpt-4\n")
+            self.assertEqual(load_config()["provider"]["engine"], "gpt-4")
+            
+            self.config_file.write_text("[provider]\nengine = claude-3-opus\n")
+            self.assertEqual(load_config()["provider"]["engine"], "claude-3-opus")
+    
+    def test_load_config_returns_copy(self):
+        """Test that modifying a loaded config does not affect later loads."""
+        with patch('src.config.get_config_path', return_value=self.config_file):
+            load_config()["provider"]["engine"] = "modified"
+            self.assertEqual(load_config()["provider"]["engine"], "gpt-4")
+    
+    def test_coerce(self):
+        """Test that string config values are converted to the right types."""
+        self.assertIs(_coerce("Yes"), True)
+        self.assertIs(_coerce("0"), False)
+        self.assertEqual(_coerce("10"), 10)
+        self.assertEqual(_coerce("claude-3.5"), "claude-3.5")
+        self.assertEqual(_coerce("falsehood"), "falsehood")
+    
+    def test_format_ini_round_trip(self):
+        """Test that values written by _format_ini, including multi-line ones, parse back unchanged."""
+        config = {
+            "provider": {"engine": "claude-3.5"},
+            "formatting": {"template": "feat: {subject}\n\n{body}\nSigned-off"},
+        }
+        self.assertEqual(_parse_ini(_format_ini(config)), config)
+    
+    def test_set_config_value_writes_only_stored_values(self):
+        """Test that set_config_value does not persist defaults or environment overrides."""
+        self.config_file.write_text("[provider]\nengine = claude-3.5\n")
+        
+        with patch('src.config.get_config_path', return_value=self.config_file), \
+             patch.dict(os.environ, {"OPENROUTER_API_KEY": "env_api_key"}):
+            success, _ = set_config_value("behavior", "show_diff", "false")
+            self.assertTrue(success)
+            
+            content = self.config_file.read_text()
+            self.assertNotIn("env_api_key", content)
+            self.assertNotIn("default_commit_count", content)
+            self.assertIn("engine = claude-3.5", content)
+            self.assertEqual(load_config()["behavior"]["show_diff"], False)
+    
     def test_save_config(self):
         """Test that save_config correctly saves the configuration to a file."""
         # Test config to save
@@ -96,19 +159,18 @@ default_commit_count = 10
             }
         }
         
-        # Mock open for writing
-        mock_file = mock_open()
-        
-        # Mock the config path
-        with patch('builtins.open', mock_file), \
-             patch('src.config.get_config_path', return_value=Path("/mock/path/.unfckrc")):
-            save_config(test_config)
+        with patch('src.config.get_config_path', return_value=self.config_file):
+            # Load once so the defaults are cached before the file exists
+            self.assertEqual(load_config()["provider"]["engine"], "gpt-4")
             
-            # Check that the file was opened for writing
-            mock_file.assert_called_once_with(Path("/mock/path/.unfckrc"), "w")
+            save_config(test_config)
             
-            # Check that write was called (we don't check the exact content as it depends on ConfigParser's formatting)
-            self.assertTrue(mock_file().write.called)
+            # The saved file parses back to the same values, not the cached ones
+            config = load_config()
+            self.assertEqual(config["provider"]["api_key"], "test_api_key")
+            self.assertEqual(config["provider"]["engine"], "claude-3.5")
+            self.assertEqual(config["defaults"]["auto_apply"], True)
+            self.assertEqual(config["defaults"]["default_commit_count"], 10)
 
 
 if __name__ == "__main__":
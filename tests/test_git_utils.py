@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import subprocess
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import git_utils
+from src.git_utils import (
+    get_commit_info, rewrite_head_commit, rewrite_commit_messages_batch,
+    reachable_from_head, _rewrite_commit_object
+)
+
+
+class GitRepoTestCase(unittest.TestCase):
+    """Base class for tests that run against a temporary Git repository."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_dir = os.getcwd()
+
+        # git_utils works on the repository in the current directory
+        os.chdir(self.temp_dir.name)
+        self.git("init", "-q")
+        self.git("symbolic-ref", "HEAD", "refs/heads/main")
+        self.git("config", "user.name", "Test User")
+        self.git("config", "user.email", "test@example.com")
+        self.reset_git_utils()
+
+    def tearDown(self):
+        self.reset_git_utils()
+        os.chdir(self.old_dir)
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def reset_git_utils():
+        # The persistent git processes and caches belong to one repository
+        git_utils._BATCHER.close()
+        git_utils._COMMIT_INFO.clear()
+        git_utils._head_sha.cache_clear()
+        git_utils._ensure_commit_graph.cache_clear()
+
+    def git(self, *args: str) -> str:
+        """Run git in the test repository and return its output."""
+        result = subprocess.run(["git", *args], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+
+    def commit(self, message: str, filename: str = "file.txt") -> str:
+        """Append to a file, commit it, and return the new commit's hash."""
+        with open(filename, "a") as f:
+            f.write(f"{message}\n")
+        self.git("add", filename)
+        self.git("commit", "-q", "-m", message)
+        return self.git("rev-parse", "HEAD")
+
+    def message(self, rev: str) -> str:
+        return self.git("log", "-1", "--format=%B", rev)
+
+
+class TestGetCommitInfo(GitRepoTestCase):
+    """Test cases for get_commit_info."""
+
+    def test_symbolic_name_follows_rewrite(self):
+        """Test that get_commit_info('HEAD') is not answered from the cache after HEAD is rewritten."""
+        self.commit("first")
+        self.commit("Improve single message")
+        self.assertEqual(get_commit_info("HEAD")[0], "Improve single message")
+
+        self.assertTrue(rewrite_head_commit("Brand new head msg"))
+        self.assertEqual(get_commit_info("HEAD")[0], "Brand new head msg")
+
+    def test_full_hash_is_cached(self):
+        """Test that lookups by full hash and by revision name share a cache entry."""
+        sha = self.commit("first")
+        info = get_commit_info("HEAD")
+        self.assertIs(get_commit_info(sha), info)
+
+
+class TestReplayRewrite(GitRepoTestCase):
+    """Test cases for rewriting past commits by replaying their objects."""
+
+    def rewrite(self, messages) -> bool:
+        with redirect_stdout(io.StringIO()):
+            return rewrite_commit_messages_batch(messages)
+
+    def assert_no_filter_branch(self):
+        self.assertEqual(self.git("for-each-ref", "refs/original/"), "")
+
+    def test_root_commit_target(self):
+        """Test that the root commit can be rewritten and its descendants keep their content."""
+        root = self.commit("root")
+        self.commit("second")
+        self.commit("third")
+        tree = self.git("rev-parse", "HEAD^{tree}")
+
+        self.assertTrue(self.rewrite({root: "Add the initial file"}))
+
+        self.assertEqual(self.message("HEAD~2"), "Add the initial file")
+        self.assertEqual(self.message("HEAD~1"), "second")
+        self.assertEqual(self.message("HEAD"), "third")
+        self.assertEqual(self.git("rev-list", "--max-parents=0", "HEAD"), self.git("rev-parse", "HEAD~2"))
+        self.assertEqual(self.git("rev-parse", "HEAD^{tree}"), tree)
+        self.assert_no_filter_branch()
+
+    def test_merge_inside_range(self):
+        """Test that a merge after the target keeps both parents and the side branch is shared."""
+        self.commit("base")
+        target = self.commit("target")
+        self.git("checkout", "-q", "-b", "side", "HEAD~1")
+        side = self.commit("side work", filename="side.txt")
+        self.git("checkout", "-q", "main")
+        self.commit("after target")
+        self.git("merge", "-q", "--no-ff", "side", "-m", "Merge side")
+        self.commit("tip")
+        tree = self.git("rev-parse", "HEAD^{tree}")
+
+        self.assertTrue(self.rewrite({target: "Rewrite the target"}))
+
+        merge = self.git("rev-parse", "HEAD~1")
+        parents = self.git("log", "-1", "--format=%P", merge).split()
+        self.assertEqual(len(parents), 2)
+        self.assertEqual(parents[1], side)
+        self.assertEqual(self.message(merge), "Merge side")
+        self.assertEqual(self.message("HEAD~1^1~1"), "Rewrite the target")
+        self.assertEqual(self.git("rev-parse", "HEAD^{tree}"), tree)
+        self.assert_no_filter_branch()
+
+    def test_several_targets(self):
+        """Test that several commits are rewritten in one pass."""
+        first = self.commit("a")
+        self.commit("b")
+        third = self.commit("c")
+        self.commit("d")
+
+        self.assertTrue(self.rewrite({first: "New first", third: "New third"}))
+
+        messages = self.git("log", "--format=%s", "HEAD").split("\n")
+        self.assertEqual(messages, ["d", "New third", "b", "New first"])
+        self.assert_no_filter_branch()
+
+    def test_head_moved_during_rewrite_aborts(self):
+        """Test that the rewrite is abandoned, without falling back to filter-branch, if HEAD moves."""
+        first = self.commit("a")
+        second = self.commit("b")
+        self.commit("c")
+
+        # HEAD is read before the rewrite starts; then another commit lands
+        git_utils._head_sha(os.getcwd())
+        moved = self.commit("d")
+
+        self.assertFalse(self.rewrite({first: "New a", second: "New b"}))
+
+        self.assertEqual(self.git("rev-parse", "HEAD"), moved)
+        self.assertEqual(self.git("log", "--format=%s", "HEAD").split("\n"), ["d", "c", "b", "a"])
+        self.assert_no_filter_branch()
+
+    def test_off_branch_target_skipped(self):
+        """Test that a commit on another branch is skipped while the rest of the batch is rewritten."""
+        first = self.commit("a")
+        second = self.commit("b")
+        self.git("checkout", "-q", "-b", "side", "HEAD~1")
+        side = self.commit("side work", filename="side.txt")
+        self.git("checkout", "-q", "main")
+        self.commit("c")
+
+        self.assertEqual(reachable_from_head([first, side, second]), [first, second])
+        self.assertTrue(self.rewrite({first: "New a", second: "New b", side: "New side"}))
+
+        self.assertEqual(self.git("log", "--format=%s", "HEAD").split("\n"), ["c", "New b", "New a"])
+        self.assertEqual(self.message("side"), "side work")
+        self.assert_no_filter_branch()
+
+    def test_rewrite_commit_object_drops_signature(self):
+        """Test that rewritten commit objects lose their signature and encoding but keep other headers."""
+        payload = (
+            b"tree 1111111111111111111111111111111111111111\n"
+            b"parent 2222222222222222222222222222222222222222\n"
+            b"author A <a@b> 1700000000 +0000\n"
+            b"committer A <a@b> 1700000000 +0000\n"
+            b"encoding ISO-8859-1\n"
+            b"gpgsig -----BEGIN PGP SIGNATURE-----\n"
+            b" abcdef\n"
+            b" -----END PGP SIGNATURE-----\n"
+            b"\n"
+            b"old message\n"
+        )
+        new_parent = "3333333333333333333333333333333333333333"
+
+        rewritten = _rewrite_commit_object(
+            payload, {"2222222222222222222222222222222222222222": new_parent}, "new message\n"
+        )
+
+        self.assertEqual(rewritten, (
+            b"tree 1111111111111111111111111111111111111111\n"
+            b"parent 3333333333333333333333333333333333333333\n"
+            b"author A <a@b> 1700000000 +0000\n"
+            b"committer A <a@b> 1700000000 +0000\n"
+            b"\n"
+            b"new message\n"
+        ))
+
+        # Commits with unchanged parents and message are left byte for byte
+        self.assertIs(_rewrite_commit_object(payload, {}, None), payload)
+
+
+class TestFilterBranchRewrite(GitRepoTestCase):
+    """Test cases for the filter-branch fallback."""
+
+    def test_messages_larger_than_env_limit(self):
+        """Test that messages too big for one environment variable are still passed to the filter."""
+        first = self.commit("a")
+        second = self.commit("b")
+        self.commit("c")
+        body = "\n".join(f"Line {i} of a very long body" for i in range(6000))
+
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(git_utils._filter_branch_messages({first: "New a", second: f"New b\n\n{body}"}))
+
+        self.assertEqual(self.git("log", "--format=%s", "HEAD").split("\n"), ["c", "New b", "New a"])
+        self.assertEqual(self.message("HEAD~1"), f"New b\n\n{body}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import os
+import unittest
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm_providers import (
+    HistoryIndex, _PromptCache, _prompt_context, create_prompt, shrink_diff,
+    parse_batch_response
+)
+
+
+def make_diff(*paths: str) -> str:
+    """Build a minimal diff that touches the given files."""
+    return "".join(f"diff --git a/{path} b/{path}\n@@ -1 +1 @@\n-old\n+new\n" for path in paths)
+
+
+HISTORY = [
+    ("Cache parsed config files by mtime", ("src/config.py", "tests/test_config.py")),
+    ("Add a --no-cache flag", ("src/cli.py", "README.md")),
+    ("Retry OpenRouter requests on 429", ("src/llm_providers.py",)),
+    ("Document the config file format", ("README.md",)),
+]
+
+
+class TestHistoryIndex(unittest.TestCase):
+    """Test cases for the few-shot example index."""
+
+    def test_retrieve_most_similar_first(self):
+        """Test that commits touching the same files rank above ones that don't."""
+        index = HistoryIndex(lambda: HISTORY, k=2)
+        examples = index.retrieve(make_diff("src/config.py"))
+
+        self.assertEqual(examples[0][0], "Cache parsed config files by mtime")
+        self.assertLessEqual(len(examples), 2)
+
+    def test_retrieve_skips_own_subject_and_repeats(self):
+        """Test that the commit being rewritten and duplicate subjects are not used as examples."""
+        history = HISTORY + [("Cache parsed config files by mtime", ("src/config.py",))]
+        index = HistoryIndex(lambda: history, k=3)
+
+        subjects = [subject for subject, _ in index.retrieve(make_diff("src/config.py"), "Add a --no-cache flag")]
+
+        self.assertEqual(subjects.count("Cache parsed config files by mtime"), 1)
+        self.assertNotIn("Add a --no-cache flag", subjects)
+
+    def test_retrieve_unrelated_files(self):
+        """Test that a diff sharing no terms with the history gets no examples."""
+        index = HistoryIndex(lambda: HISTORY, k=2)
+        self.assertEqual(index.retrieve(make_diff("docs/ops/deploy.yaml")), [])
+        self.assertEqual(HistoryIndex(lambda: [], k=2).retrieve(make_diff("src/config.py")), [])
+
+    def test_history_loaded_lazily_once(self):
+        """Test that the history is only read on the first lookup."""
+        calls = []
+
+        def load():
+            calls.append(1)
+            return HISTORY
+
+        index = HistoryIndex(load, k=2)
+        self.assertEqual(calls, [])
+
+        index.retrieve(make_diff("src/cli.py"))
+        index.retrieve(make_diff("README.md"))
+        self.assertEqual(calls, [1])
+
+    def test_examples_in_prompt(self):
+        """Test that retrieved examples are added to the prompt."""
+        index = HistoryIndex(lambda: HISTORY, k=1)
+        prompt = create_prompt(make_diff("src/cli.py"), "stuff", None, 8000, index)
+        self.assertIn('- "Add a --no-cache flag" (src/cli.py, README.md)', prompt)
+
+    def test_cache_key_covers_prompt_settings(self):
+        """Test that the diff budget and example history change the response cache key."""
+        def key(max_diff_chars, history):
+            return _PromptCache.key("diff", "stuff", None, "gpt-4", _prompt_context(max_diff_chars, history))
+
+        self.assertNotEqual(key(8000, None), key(16000, None))
+        self.assertNotEqual(key(8000, None), key(8000, HistoryIndex(lambda: HISTORY, k=2, fingerprint="abc")))
+        self.assertNotEqual(
+            key(8000, HistoryIndex(lambda: HISTORY, k=2, fingerprint="abc")),
+            key(8000, HistoryIndex(lambda: HISTORY, k=2, fingerprint="def")),
+        )
+        self.assertEqual(
+            key(8000, HistoryIndex(lambda: HISTORY, k=2, fingerprint="abc")),
+            key(8000, HistoryIndex(lambda: HISTORY, k=2, fingerprint="abc")),
+        )
+
+
+def file_diff(path: str, *hunks) -> str:
+    """Build the diff of one file from (hunk header, added lines) pairs."""
+    lines = [f"diff --git a/{path} b/{path}", f"--- a/{path}", f"+++ b/{path}"]
+    for header, added in hunks:
+        lines.append(header)
+        lines.extend(f"+{line}" for line in added)
+    return "\n".join(lines) + "\n"
+
+
+class TestShrinkDiff(unittest.TestCase):
+    """Test cases for fitting diffs into the prompt budget."""
+
+    def test_short_diff_unchanged(self):
+        """Test that a diff within the budget is returned as is."""
+        diff = file_diff("src/cli.py", ("@@ -1 +1 @@", ["x"]))
+        self.assertIs(shrink_diff(diff, max_chars=len(diff)), diff)
+
+    def test_lockfile_dropped(self):
+        """Test that a lock file keeps only its header while source files keep their changes."""
+        lock = file_diff("poetry.lock", ("@@ -1,300 +1,300 @@", [f'name = "package-{i}"' for i in range(300)]))
+        source = file_diff("src/cli.py", ("@@ -1,2 +1,2 @@", ["import sys", "print(sys.argv)"]))
+
+        shrunk = shrink_diff(lock + source, max_chars=2000)
+
+        self.assertIn("diff --git a/poetry.lock b/poetry.lock", shrunk)
+        self.assertIn("... (301 lines of changes omitted) ...", shrunk)
+        self.assertNotIn("package-0", shrunk)
+        self.assertIn("+print(sys.argv)", shrunk)
+
+    def test_long_file_keeps_head_and_tail(self):
+        """Test that a long file keeps its first and last lines and repeats the tail's hunk header."""
+        diff = file_diff(
+            "src/git_utils.py",
+            ("@@ -1,20 +1,20 @@", [f"a{i}" for i in range(20)]),
+            ("@@ -50,3 +50,3 @@", [f"b{i}" for i in range(3)]),
+        )
+
+        # 12 lines per file: 10 from the start and 2 from the end
+        lines = shrink_diff(diff, max_chars=len(diff) - 1, max_lines_per_file=12).split("\n")
+
+        self.assertEqual(lines[:4], ["diff --git a/src/git_utils.py b/src/git_utils.py", "--- a/src/git_utils.py",
+                                     "+++ b/src/git_utils.py", "@@ -1,20 +1,20 @@"])
+        self.assertEqual(lines[4:13], [f"+a{i}" for i in range(9)])
+        self.assertEqual(lines[13:], ["... (13 lines elided) ...", "@@ -50,3 +50,3 @@", "+b1", "+b2"])
+
+    def test_stat_summary_fallback(self):
+        """Test that a diff still too long after shrinking leads with a per-file summary and is cut off."""
+        diff = "".join(
+            file_diff(f"src/module{n}.py", ("@@ -1,40 +1,40 @@", [f"line {i} of module {n}" for i in range(40)]))
+            for n in range(10)
+        )
+
+        shrunk = shrink_diff(diff, max_chars=1000)
+
+        self.assertTrue(shrunk.startswith("Changed files:\n src/module0.py | +40 -0\n"))
+        self.assertIn(" src/module9.py | +40 -0", shrunk)
+        self.assertTrue(shrunk.endswith("\n... (diff truncated) ..."))
+        self.assertLess(len(shrunk), len(diff))
+
+        # Without room for any of the diff, only the summary is left
+        summary = shrink_diff(diff, max_chars=100)
+        self.assertTrue(summary.startswith("Changed files:\n"))
+        self.assertNotIn("diff --git", summary)
+
+
+class TestParseBatchResponse(unittest.TestCase):
+    """Test cases for reading the messages out of a batch answer."""
+
+    def test_valid_json(self):
+        """Test that messages are placed by their index, whatever order they come in."""
+        content = '{"messages": [{"i": 1, "msg": "Fix the parser"}, {"i": 0, "msg": " Add a flag\\n"}]}'
+        self.assertEqual(parse_batch_response(content, 2), ["Add a flag", "Fix the parser"])
+
+    def test_json_in_code_block(self):
+        """Test that JSON wrapped in a fenced code block and prose is still found."""
+        content = 'Here you go:\n```json\n{"messages": [{"i": 0, "msg": "Add a flag"}]}\n```\n'
+        self.assertEqual(parse_batch_response(content, 1), ["Add a flag"])
+
+    def test_wrong_number_of_items(self):
+        """Test that missing entries are None and entries beyond the batch are ignored."""
+        too_few = '{"messages": [{"i": 0, "msg": "First"}, {"i": 2, "msg": "Third"}]}'
+        self.assertEqual(parse_batch_response(too_few, 3), ["First", None, "Third"])
+
+        too_many = '{"messages": [{"i": 0, "msg": "First"}, {"i": 1, "msg": "Second"}, {"i": 5, "msg": "Extra"}]}'
+        self.assertEqual(parse_batch_response(too_many, 2), ["First", "Second"])
+
+    def test_unusable_answers(self):
+        """Test that answers without usable messages give a None for every item."""
+        for content in [
+            "Sorry, I can't help with that.",
+            "",
+            '{"messages": "not a list"}',
+            '["Add a flag"]',
+            '{"messages": [{"i": "0", "msg": "Add a flag"}, {"i": 1, "msg": "  "}, "junk"]}',
+            '{"messages": [{"i": 0, "msg": "Add a flag"}',
+        ]:
+            with self.subTest(content=content):
+                self.assertEqual(parse_batch_response(content, 3), [None, None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()